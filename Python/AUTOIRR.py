@@ -24,34 +24,14 @@ id: suggested nominal irrigation depth (mm) (OMAFRA, 2004)
 root: typical crop rooting depth (mm)(OMAFRA, 2004)
 interval: suggested irrigation interval (OMAFRA, 2004)
 CWR: crop water requirement (mm) caluclated as sum of simulated actual evapotranspiration of crop/HRU/year
+
+The ISM algorithm is implemented in the isms package (isms/autoirr.py). This script only holds the settings of the SWAT project and runs the ISM; the same run can be started
+from the command line with python -m isms AUTOIRR (see isms/cli.py).
  """
 
 
 # Import libraries
-import os
-import pandas as pd
-import numpy as np
-import shutil
-import re
-from distutils.dir_util import copy_tree
-import datetime as dt
-from datetime import datetime
-from os import getcwd, listdir
-from os.path import isfile, join
-import csv
-
-# Read current SWAT project output.hru.  
-
-output_hru = pd.read_csv('output.hru', sep='\s+', skiprows=9, header=None) #skip first 9 rows, including header row because SWAT does not output delimited headers.
-output_hru.columns = ["LULC","HRU","GIS","SUB","MGT","MON","DAY","YEAR", "AREAkm2","PRECIPmm","SNOFALLmm","SNOMELTmm","IRRmm","PETmm","ETmm","SW_INITmm","SW_ENDmm",
-                    "PERCmm","GW_RCHGmm","DA_RCHGmm","REVAPmm","SA_IRRmm","DA_IRRmm","SA_STmm","DA_STmm","SURQ_GENmm","SURQ_CNTmm","TLOSSmm","LATQGENmm",
-                    "GW_Qmm","WYLDmm","DAILYCN","TMP_AVdgC","TMP_MXdgC","TMP_MNdgC","SOL_TMPdgC","SOLARMJ/m2","SYLDt/ha","USLEt/ha","N_APPkg/ha","P_APPkg/ha",
-                    "NAUTOkg/ha","PAUTOkg/ha","NGRZkg/ha","PGRZkg/ha","NCFRTkg/ha","PCFRTkg/ha","NRAINkg/ha","NFIXkg/ha","F-MNkg/ha","A-MNkg/ha","A-SNkg/ha",
-                    "F-MPkg/ha","AO-LPkg/ha","L-APkg/ha","A-SPkg/ha","DNITkg/ha","NUPkg/ha","PUPkg/ha","ORGNkg/ha","ORGPkg/ha","SEDPkg/ha","NSURQkg/ha",
-                    "NLATQkg/ha","NO3Lkg/ha","NO3GWkg/ha","SOLPkg/ha","P_GWkg/ha","W_STRS","TMP_STRS","N_STRS","P_STRS","BIOMt/ha","LAI","YLDt/ha",
-                    "BACTPct","BACTLPct","WTABCLIm","WTABSOLm","SNOmm","CMUPkg/ha","CMTOTkg/ha","QTILEmm","TNO3kg/ha","LNO3kg/ha","GW_Q_Dmm","LATQCNTmm"] #reassign headers
-
-hrus = pd.DataFrame(output_hru)
+from isms import autoirr
 
 #Crops and associated parameters to be defined by user. Users can include as many crops as applicable. Crop names should be consistent with SWAT LULC codes.
 crops = {
@@ -87,93 +67,17 @@ crops = {
     }
 }
 
-# This code creates formatting for scheduled management operation lines input into the SWAT .mgt files. Refer to the SWAT 2012 input/output documentation for definitions of variables below.
-def generate_string(file, month, day, ops_no, fert_id = "", irr_sc="", wtrstrs="", irr_efm="", irr="", hi_targ="", bio_targ="", sub=""):
-    string = str(month).rjust(3)
-    string += str(day).rjust(3)
-    string += str(ops_no).rjust(12)
-    string += str(fert_id).rjust(5) #WSTRSID for AUTORIRR
-    string += str(irr_sc).rjust(4)
-    string += str('{:.5f}'.format(float(wtrstrs)) if wtrstrs != '' else '').rjust(16) 
-    string += str('{:.2f}'.format(float(irr_efm)) if irr_efm != '' else '').rjust(7)
-    string += str(format(float(irr), '.5f') if irr != '' else '').rjust(12)  
-    string += str('{:.2f}'.format(float(hi_targ)) if hi_targ != '' else '').rjust(5)
-    string += str('{:.2f}'.format(float(bio_targ)) if bio_targ != '' else '').rjust(7)
-    string += str(sub).rjust(18)
-    file.write(string + '\n')
-
-
-# This code defines a function that inputs scheduled management operation "17", end of year flag, into the correct scheduled management operation line position. This signifies the end of the growing season and tells SWAT to start a new year of scheduled management ops. 
-def generate_year_delim(file):
-    return file.write("17".rjust(18) + "\n")
-
-# This code defines a function that returns a line break in the .mgt scheduled management operation lines.
-def insert_break(file):
-    return file.write("\n")
-
-# This code creates a directory for all SWAT .mgt files, which will be appended later 
-directory = "[INSERT DIRECTORY HERE]" # sets mgt files as directory for appending later
-tmp_directory = os.path.join(directory, "tmp") # defines path of temporary subfolder
-shutil.rmtree(tmp_directory, ignore_errors = True) #deletes subbfolder if already exists, bypasses errors if it doesn't
-os.mkdir(tmp_directory)  #Recreates tmp directory
-copy_tree(directory, tmp_directory) #Copies .mgt files to temporary directory.
-mgt_files = [f for f in listdir(tmp_directory) if isfile(join(tmp_directory, f))] # reads each .mgt file in temporary directory
-
-#Each crop will also have additional scheduled management operations that are not irrigation (ex., fertilizer applications, tillage, pesticde applications...). This additional schedule must be created as a csv. 
-# The data is then read here and later integrated with the ISM schedule by date.
-corn = pd.read_csv("corn.csv", keep_default_na=False)
-soyb = pd.read_csv("SOYB.csv", keep_default_na=False)
-tobc = pd.read_csv("TOBC.csv", keep_default_na=False)
-
-# This code loops through each .mgt file in the pre-determined directory.
-for mgt_file in mgt_files:
-    mgt_file = os.path.join(tmp_directory, mgt_file) #loops through selecting mgt files in tmp_directory.
-    with open(mgt_file, "r+") as file:
-        data = file.read() #reads file
-        index = data.index("Operation Schedule") + 50
-        file.seek(index)
-        hru = int(re.search(r"(?<=HRU\:)\d+", data)[0]) #regex; looking for HRU: and digits after, in data file. returns a list of every match in file. This searches for HRU number in each mgt file.
-        subbasin = int(re.search(r"(?<=Subbasin\:)\d+", data)[0]) #same as above but for subbasin
-        crop_key = re.search(r"(?<=Luse\:)[A-Z]+", data)[0] #same as above but for land use
-
-# The code below runs the AUTOIRR ISM algorithm. The code runs through the daily time series as set by the user and writes operation lines to the .mgt files corresponding with crops of interest. 
-# This code bypasses the "end of year" bug by manually forcing irrigation operations to end at the respective crop's end(harvest) date.
+# SWAT project settings to be defined by user (see isms/project.py)
+project = {
+    "directory": "[INSERT DIRECTORY HERE]", # directory of the SWAT .mgt files. The .mgt files with the ISM schedule are written to its tmp subfolder.
+    "output_hru": "output.hru", # SWAT project output.hru
+    "start": "YYYY-MM-DD", #INPUT YOUR SWAT PROJECT START DATE HERE
+    "end": "YYYY-MM-DD", #INPUT YOUR SWAT PROJECT END DATE HERE
+    "spinup_year": 2007, #Input your SWAT spin-up start year here
+    "calibration_year": "insert start year here", #Input your SWAT calibration start year here
+    "crops": crops,
+    "extra_ops": {"CORN": "corn.csv", "SOYB": "SOYB.csv", "TOBC": "TOBC.csv"}, # user-created csvs of extra management operations per crop
+    "resume": True, #Resumes a crashed run with the same settings and input files, skipping units (subbasins) already finished. Set to False to discard the previous run and start over.
+}
 
-        if crop_key in crops.keys(): # only runs if crop is in crops list (tobc, corn, soyb)
-            crop = crops[crop_key]
-            extra_ops = globals()[crop_key.lower()]
-            dates = pd.date_range(start = "YYYY-MM-DD", end = "YYYY-MM-DD") #INPUT YOUR SWAT PROJECT START AND END DATES HERE
-            day_count = 0
-            year_break = 2007 #Input your SWAT spin-up start year here
-            for date in dates:
-                year = date.year
-                month = date.month
-                day = date.day
-                start_date = dt.datetime(year, crop["start mon"], crop["start day"])
-                end_date = dt.datetime(year, crop["end mon"], crop["end day"])
-                
-                # This code generates input scheduled operation lines for all management operations other than irrigation
-                filtered_extra_ops = extra_ops.query(f'Month == {month} and Day == {day} and Year == {year}')
-                for index, extra_op in filtered_extra_ops.iterrows():
-               
-                    generate_string(file, month, day, extra_op["ops_no"], extra_op["fert_id"], "", extra_op["wtrstrs"], extra_op["irr_efm"], extra_op["irr"], extra_op["hi_targ"], extra_op["bio_targ"], "") 
-                
-                if year != year_break:
-                    generate_year_delim(file)
-                    year_break = year
-                
-                #First irrigation application:
-                if year >= "insert start year here" and date == start_date:
-                    #This code generates the irrigation management operation line to be appended to the .mgt file in the correct format. Note that here we have two strings:
-                    #The first string has irrigation source (IRR_SC) set to 3 (sourced from shallow aquifer). The second string has irrigation source set to 1 (main channel)
-                    #This is because we set each irrigation application to be sourced and partitioned from both the aquifer and the channel.
-                    #Users can delete the extra string if they are only using one source, or add more if they are using more.
-                    generate_string(file, month, day, "10", "2", "3", "35.32", "0.75", crop["gw"], "0.00", "", subbasin)  # User to define their own AUTOIRR parameters here
-                    generate_string(file, month, day, "10", "2", "1", "35.32", "0.75", crop["sw"], "0.00", "", subbasin)  
-                else:
-                    continue
-                #This code ends the calendar year and tells SWAT to start the next year of management ops.
-                if day == 31 and month == 12:               
-                    generate_year_delim(file)        
-                    print(file.name)
-print("done")
+autoirr.run(project)
@@ -0,0 +1,38 @@
+"""
+Irrigation Scheduling Models (ISMs)
+
+This package includes the AUTOIRR, DRIPIRR, CON-S and EB-SWC ISMs developed in Zamaria and Arhonditsis (2025) for the purposes of scheduling irrigation operations
+to be input into a working SWAT model. Each ISM is a module with a run(project) function (see project.py for the project settings):
+
+from isms import ebswc
+ebswc.run({"directory": "mgt_files", "sol_directory": "sol_files", "start": "2007-01-01", "end": "2019-12-31", "spinup_year": 2007, "calibration_year": 2009})
+
+The ISMs can also be run from the command line (see cli.py):
+python -m isms EB-SWC --directory mgt_files --sol-directory sol_files --start 2007-01-01 --end 2019-12-31 --spinup-year 2007 --calibration-year 2009
+
+Submodules are imported when first used, and pandas/numpy are only imported when an ISM runs, so importing the package, the --help and --plan paths of the
+command line interface, and forked worker processes start without loading them.
+"""
+
+import importlib
+
+# ISM names and the module running each ISM
+ISMS = {
+    "AUTOIRR": "autoirr",
+    "DRIPIRR": "dripirr",
+    "CON-S": "cons",
+    "EB-SWC": "ebswc",
+}
+
+_SUBMODULES = {"autoirr", "dripirr", "cons", "ebswc", "batch", "checkpoint", "cli", "crop_calendar", "file_io", "mgt_catalog", "mgt_output", "plan", "project", "scenario_archive", "schedule_blocks", "schedule_export", "swat_files", "tail"}
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# This code runs one ISM, by name, on a SWAT project.
+def run(ism, project):
+    return importlib.import_module("." + ISMS[ism], __name__).run(project)
@@ -0,0 +1,150 @@
+"""
+AUTOIRR ISM
+
+This code replicates the SWAT AUTOIRR function and defines an end of season/harvest date that bypasses the "end of season" bug, where SWAT will continue to irrigate according to the AUTOIRR algorithm even after crops are harvested.
+On the planting date of every year after the calibration start year, AUTOIRR operations (op 10) are scheduled with the user-defined AUTOIRR parameters, such as AUTO_WSTRS (water stress threshold
+that triggers irrigation) and IRR_SCA (auto irrigation source code). Extra management operations that are not irrigation are scheduled from the user-created csvs.
+
+DEFS:
+sw: surface water
+gw: groundwater
+id: suggested nominal irrigation depth (mm) (OMAFRA, 2004)
+interval: suggested irrigation interval (OMAFRA, 2004)
+"""
+
+import io
+
+from . import mgt_output, schedule_blocks, swat_files
+
+#Crops and associated parameters to be defined by user. Users can include as many crops as applicable. Crop names should be consistent with SWAT LULC codes.
+crops = {
+    "CORN": {
+        "start mon": 5,  #initial planting month
+        "start day": 7,  #initial planting day
+        "end mon": 10,   #end of season harvest month
+        "end day": 25,   #end of season harvest day
+        "interval": 14,  #irrigation interval (days)
+        "id": 50,        #irrigation depth per application (mm)
+        "sw": 13.5,      #amount of irrigation depth sourced from surface water (mm)
+        "gw": 36.5       #amount of irrigation depth sourced from groundwater (mm)
+    },
+    "SOYB": {
+        "start mon": 5,
+        "start day": 17,
+        "end mon": 10,
+        "end day": 15,
+        "interval": 7,
+        "id": 25,
+        "sw": 6.75,
+        "gw": 18.25
+    },
+    "TOBC": {
+        "start mon": 5,
+        "start day": 17,
+        "end mon": 10,
+        "end day": 1,
+        "interval": 7,
+        "id": 30,
+        "sw": 8.1,
+        "gw": 21.9
+    }
+}
+
+
+# This code creates formatting for scheduled management operation lines input into the SWAT .mgt files. Refer to the SWAT 2012 input/output documentation for definitions of variables below.
+def generate_string(file, month, day, ops_no, fert_id = "", irr_sc="", wtrstrs="", irr_efm="", irr="", hi_targ="", bio_targ="", sub=""):
+    string = str(month).rjust(3)
+    string += str(day).rjust(3)
+    string += str(ops_no).rjust(12)
+    string += str(fert_id).rjust(5) #WSTRSID for AUTORIRR
+    string += str(irr_sc).rjust(4)
+    string += str('{:.5f}'.format(float(wtrstrs)) if wtrstrs != '' else '').rjust(16)
+    string += str('{:.2f}'.format(float(irr_efm)) if irr_efm != '' else '').rjust(7)
+    string += str(format(float(irr), '.5f') if irr != '' else '').rjust(12)
+    string += str('{:.2f}'.format(float(hi_targ)) if hi_targ != '' else '').rjust(5)
+    string += str('{:.2f}'.format(float(bio_targ)) if bio_targ != '' else '').rjust(7)
+    string += str(sub).rjust(18)
+    file.write(string + '\n')
+
+
+# This code renders the scheduled operation lines for all management operations other than irrigation of one crop and year, in the AUTOIRR layout, keyed by calendar day index,
+# with the same operation lines as rows of the schedule export (see schedule_export.py). The extra operations of the year are queried once, and the lines are the same for every HRU
+# of the crop, so they are rendered once per crop and year and shared through the schedule block cache (see schedule_blocks.py).
+def render_extra_ops(calendar, extra_ops, year):
+    start, stop = calendar["years"][year]
+    day_index = {(calendar["month"][i], calendar["day"][i]): i for i in range(start, stop)}
+    extra_block = {}
+    for index, extra_op in extra_ops.query(f'Year == {year}').iterrows():
+        i = day_index.get((extra_op["Month"], extra_op["Day"]))
+        if i is None:
+            continue #operation date is outside of the simulation period
+        block = io.StringIO()
+        generate_string(block, calendar["month"][i], calendar["day"][i], extra_op["ops_no"], extra_op["fert_id"], "", extra_op["wtrstrs"], extra_op["irr_efm"], extra_op["irr"], extra_op["hi_targ"], extra_op["bio_targ"], "")
+        text, rows = extra_block.get(i, ("", []))
+        extra_block[i] = (text + block.getvalue(), rows + [(i, extra_op["ops_no"], None, extra_op["irr"], extra_op["irr_efm"])])
+    return extra_block
+
+
+# The code below runs the AUTOIRR ISM algorithm for one crop, year and subbasin. The code runs through the days of the year that have operation lines: the pre-rendered lines
+# of the extra management operations (see render_extra_ops), the end of year flags, and the AUTOIRR lines, which only differ between subbasins by their subbasin field.
+# The AUTOIRR schedule does not depend on the HRU, so the rendered lines are shared by all HRUs of the crop in the subbasin through the schedule block cache (see schedule_blocks.py).
+# Returns the rendered lines and the same operation lines as rows of the schedule export (see schedule_export.py). Only the days from first on are rendered (see tail.py).
+# This code bypasses the "end of year" bug by manually forcing irrigation operations to end at the respective crop's end(harvest) date.
+def render_year(calendar, crop, season, extra_block, year, subbasin, first=0):
+    import numpy as np
+
+    block = io.StringIO()
+    rows = []
+    start, stop = calendar["years"][year]
+    start = max(start, first)
+    autoirr_days = np.flatnonzero(calendar["calibration"][start:stop] & season["season_start"][start:stop]) + start
+    new_year_days = np.flatnonzero(calendar["new_year"][start:stop]) + start
+    for i in sorted({i for i in extra_block if start <= i < stop} | set(autoirr_days.tolist()) | set(new_year_days.tolist())):
+        month = calendar["month"][i]
+        day = calendar["day"][i]
+
+        # This code adds the pre-rendered scheduled operation lines for all management operations other than irrigation
+        text, extra_rows = extra_block.get(i, ("", ()))
+        block.write(text)
+        rows.extend(extra_rows)
+
+        if calendar["new_year"][i]:
+            swat_files.generate_year_delim(block)
+
+        #First irrigation application:
+        if calendar["calibration"][i] and season["season_start"][i]:
+            #This code generates the irrigation management operation line to be appended to the .mgt file in the correct format. Note that here we have two strings:
+            #The first string has irrigation source (IRR_SC) set to 3 (sourced from shallow aquifer). The second string has irrigation source set to 1 (main channel)
+            #This is because we set each irrigation application to be sourced and partitioned from both the aquifer and the channel.
+            #Users can delete the extra string if they are only using one source, or add more if they are using more.
+            generate_string(block, month, day, "10", "2", "3", "35.32", "0.75", crop["gw"], "0.00", "", subbasin)  # User to define their own AUTOIRR parameters here
+            generate_string(block, month, day, "10", "2", "1", "35.32", "0.75", crop["sw"], "0.00", "", subbasin)
+            rows.extend([(i, 10, 3, crop["gw"], 0.75), (i, 10, 1, crop["sw"], 0.75)])
+        else:
+            continue
+        #This code ends the calendar year and tells SWAT to start the next year of management ops.
+        if calendar["year_end"][i]:
+            swat_files.generate_year_delim(block)
+    return block.getvalue(), rows
+
+
+# This code writes the AUTOIRR schedule of every year to the .mgt file of an HRU. The extra management operation lines are rendered once per crop and year,
+# and the schedule of a year once per crop, year and subbasin. Only the days from first on are scheduled (see tail.py).
+def schedule_hru(run, mgt_file, header):
+    calendar = run["calendar"]
+    cache = run["cache"]
+    crop_key = header["crop"]
+    subbasin = header["subbasin"]
+    crop = run["crops"][crop_key]
+    season = calendar["crops"][crop_key] #precomputed growing season masks of the crop
+    blocks = []
+    for year in calendar["years"]:
+        extra_block = schedule_blocks.get_block(cache, (crop_key, year, None), lambda: render_extra_ops(calendar, run["extra_ops"][crop_key], year))
+        blocks.append(schedule_blocks.get_block(cache, (crop_key, year, subbasin), lambda: render_year(calendar, crop, season, extra_block, year, subbasin, run["first"])))
+    print(mgt_file)
+    return "".join(text for text, rows in blocks), [row for text, rows in blocks for row in rows], {}
+
+
+# This code runs the AUTOIRR ISM over all .mgt files of a SWAT project (see project.py for the project settings). AUTOIRR does not read output.hru.
+def run(project):
+    mgt_output.run_ism(project, "AUTOIRR", crops, schedule_hru)
@@ -0,0 +1,213 @@
+"""
+Batch runs across SWAT projects
+
+This code runs the ISMs on many SWAT projects (ex., one SWAT project per Lake Erie tributary) in one batch. The projects are listed in a JSON manifest; every project has its own
+settings (see project.py): paths, dates, spin-up/calibration years, crops and extra management operation csvs. Settings shared by all projects are given once under "defaults".
+
+Every project x ISM pair is a job. All jobs of the batch share one pool of worker processes:
+1. Jobs are balanced by project size: the runtime of every job is estimated by the run planner (see plan.py) and the longest jobs are started first, so that small projects
+   fill in the gaps at the end of the batch instead of a large project starting last.
+2. Crop tables given as JSON files are parsed once per batch, and the extra management operation csvs are parsed once per worker process (see swat_files.read_extra_ops),
+   so projects sharing crop tables or csvs reuse the parsed tables.
+3. A failed job does not stop the batch. The output printed by every job is written to its log file (log_directory/[project].[ISM].log).
+4. At the end of the batch, one status and timing report of all jobs is printed and written to a JSON file.
+
+Each job needs its own output. Jobs writing loose .mgt files to the tmp folder of a project's .mgt directory cannot share that directory, so projects running more than
+one ISM should write scenario archives (see scenario_archive.py), ex., "archive": "scenarios/{project}/{ism}.zip" in the defaults, where {project} and {ism} are replaced
+by the project and ISM names. A schedule_export directory shared by the projects should be given per project the same way, ex., "schedules/{project}"; it only takes {project}, as the dataset is
+already partitioned by ISM.
+
+Manifest:
+{
+    "defaults": {"start": "2007-01-01", "end": "2019-12-31", "spinup_year": 2007, "calibration_year": 2009, "crops": "crops.json", "archive": "scenarios/{project}/{ism}.zip"},
+    "projects": {
+        "BigCreek": {"directory": "BigCreek/mgt_files", "output_hru": "BigCreek/output.hru", "sol_directory": "BigCreek/sol_files", "isms": ["AUTOIRR", "EB-SWC"]},
+        "Thames": {"directory": "Thames/mgt_files", "output_hru": "Thames/output.hru", "isms": ["DRIPIRR"]}
+    },
+    "workers": 4,
+    "report": "batch_report.json",
+    "log_directory": "batch_logs"
+}
+Relative paths, including the default output.hru and extra management operation csvs (see project.py) of projects that do not set them, are relative to the folder
+of the manifest. isms defaults to all four ISMs; crops may be a crop table or the path of a JSON file holding one.
+
+Usage (from the Python folder):
+python -m isms --batch manifest.json
+"""
+
+import contextlib
+import copy
+import json
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from . import ISMS
+from .plan import format_seconds
+from .project import DEFAULTS
+
+PATH_SETTINGS = ["directory", "output_hru", "sol_directory", "archive", "schedule_export"]
+
+
+# This code reads a batch manifest and returns the jobs of the batch, one per project and ISM.
+def read_manifest(path):
+    with open(path, "r") as file:
+        manifest = json.load(file)
+    base = os.path.dirname(os.path.abspath(path))
+    defaults = manifest.get("defaults", {})
+    crop_tables = {} #crop tables parsed once per JSON file
+
+    jobs = []
+    for name, settings in manifest["projects"].items():
+        project = copy.deepcopy(defaults)
+        project.update(copy.deepcopy(settings))
+        isms = project.pop("isms", None) or list(ISMS)
+        unknown = [ism for ism in isms if ism not in ISMS]
+        if unknown:
+            raise ValueError(f"project {name}: unknown ISM: {', '.join(unknown)}")
+
+        for key in PATH_SETTINGS:
+            value = project.get(key) or DEFAULTS.get(key) #default paths are relative to the manifest too
+            if value:
+                project[key] = os.path.join(base, value)
+        extra_ops = project.get("extra_ops") or DEFAULTS["extra_ops"]
+        project["extra_ops"] = {crop_key: os.path.join(base, extra_ops_file) for crop_key, extra_ops_file in extra_ops.items()}
+        if isinstance(project.get("crops"), str):
+            crops_file = os.path.join(base, project["crops"])
+            if crops_file not in crop_tables:
+                with open(crops_file, "r") as file:
+                    crop_tables[crops_file] = json.load(file)
+            project["crops"] = crop_tables[crops_file]
+
+        for ism in isms:
+            job_project = dict(project)
+            if job_project.get("archive"):
+                job_project["archive"] = format_output(name, "archive", job_project["archive"], project=name, ism=ism)
+            if job_project.get("schedule_export"):
+                job_project["schedule_export"] = format_output(name, "schedule_export", job_project["schedule_export"], project=name) #the dataset is partitioned by ISM
+            jobs.append({"project": name, "ism": ism, "settings": job_project})
+
+    check_outputs(jobs)
+    return {
+        "jobs": jobs,
+        "workers": manifest.get("workers") or os.cpu_count() or 1,
+        "report": os.path.join(base, manifest.get("report", "batch_report.json")),
+        "log_directory": os.path.join(base, manifest.get("log_directory", "batch_logs")),
+    }
+
+
+# This code replaces the fields ({project}, {ism}) of an output path setting of a job. Other fields (ex., {ism} in schedule_export) are rejected.
+def format_output(name, key, value, **fields):
+    try:
+        return value.format(**fields)
+    except (KeyError, IndexError, ValueError):
+        allowed = " and ".join("{" + field + "}" for field in fields)
+        raise ValueError(f"project {name}: {key} can only contain {allowed}: {value}") from None
+
+
+# This code checks that no two jobs write to the same output: the same scenario archive, the tmp folder of the same .mgt directory, or the same schedule export partition.
+def check_outputs(jobs):
+    outputs = {}
+    for job in jobs:
+        settings = job["settings"]
+        output = os.path.abspath(settings["archive"]) if settings.get("archive") else os.path.join(os.path.abspath(settings.get("directory") or ""), "tmp")
+        if output in outputs:
+            other = outputs[output]
+            raise ValueError(f"{job['project']} {job['ism']} and {other['project']} {other['ism']} both write to {output}; set an archive per project and ISM, ex., \"scenarios/{{project}}/{{ism}}.zip\"")
+        outputs[output] = job
+        if settings.get("schedule_export"):
+            export = os.path.join(os.path.abspath(settings["schedule_export"]), f"ism={job['ism']}")
+            if export in outputs:
+                other = outputs[export]
+                raise ValueError(f"{job['project']} {job['ism']} and {other['project']} {other['ism']} both export to {export}; set a schedule_export per project, ex., \"schedules/{{project}}\"")
+            outputs[export] = job
+
+
+# This code estimates the runtime of every job with the run planner, once per project. Jobs of projects that cannot be planned (ex., missing settings) are estimated
+# at 0 seconds; they are started last and their error is reported when they run.
+def estimate_jobs(jobs):
+    from . import plan
+
+    projects = {}
+    for job in jobs:
+        projects.setdefault(job["project"], []).append(job)
+    for project_jobs in projects.values():
+        try:
+            project_plan = plan.plan_run(project_jobs[0]["settings"], [job["ism"] for job in project_jobs])
+        except (OSError, ValueError, KeyError):
+            project_plan = {"isms": {}}
+        for job in project_jobs:
+            job["estimate"] = project_plan["isms"].get(job["ism"], {}).get("runtime seconds", 0.0)
+
+
+# This code runs one job in a worker process. The output printed by the ISM is written to the job's log file.
+def run_job(job, log_directory):
+    from . import run
+
+    os.makedirs(log_directory, exist_ok=True)
+    log = os.path.join(log_directory, f"{job['project']}.{job['ism']}.log")
+    started = time.time()
+    with open(log, "w") as file, contextlib.redirect_stdout(file):
+        try:
+            run(job["ism"], job["settings"])
+            status, error = "done", ""
+        except Exception as exc:
+            traceback.print_exc(file=file)
+            status, error = "failed", f"{type(exc).__name__}: {exc}"
+    return {
+        "project": job["project"],
+        "ism": job["ism"],
+        "status": status,
+        "error": error,
+        "estimate seconds": job.get("estimate", 0.0),
+        "seconds": time.time() - started,
+        "pid": os.getpid(),
+        "log": log,
+        "output": job["settings"].get("archive") or os.path.join(job["settings"].get("directory") or "", "tmp"),
+    }
+
+
+# This code runs all jobs of a batch on a shared pool of worker processes, longest estimated jobs first, and returns the batch report.
+def run_batch(batch):
+    jobs = sorted(batch["jobs"], key=lambda job: job.get("estimate", 0.0), reverse=True)
+    started = time.time()
+    results = []
+    with ProcessPoolExecutor(max_workers=batch["workers"]) as pool:
+        running = {pool.submit(run_job, job, batch["log_directory"]): job for job in jobs}
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as exc: #the worker process itself failed
+                    result = {"project": job["project"], "ism": job["ism"], "status": "failed", "error": f"{type(exc).__name__}: {exc}",
+                              "estimate seconds": job.get("estimate", 0.0), "seconds": 0.0, "pid": None, "log": "", "output": ""}
+                print(f"{result['project']} {result['ism']}: {result['status']} ({format_seconds(result['seconds'])})")
+                results.append(result)
+
+    order = {(job["project"], job["ism"]): index for index, job in enumerate(batch["jobs"])}
+    results.sort(key=lambda result: order[(result["project"], result["ism"])])
+    return {
+        "workers": batch["workers"],
+        "seconds": time.time() - started,
+        "job seconds": sum(result["seconds"] for result in results),
+        "jobs": results,
+    }
+
+
+# This code prints the batch report and writes it to a JSON file.
+def write_report(report, path):
+    print(f"{'project':<20}{'ISM':<10}{'status':<8}{'estimate':>14}{'runtime':>14}  output")
+    for result in report["jobs"]:
+        print(f"{result['project']:<20}{result['ism']:<10}{result['status']:<8}{format_seconds(result['estimate seconds']):>14}{format_seconds(result['seconds']):>14}  {result['output']}")
+        if result["error"]:
+            print(f"  {result['error']} (see {result['log']})")
+    failed = sum(1 for result in report["jobs"] if result["status"] != "done")
+    print(f"{len(report['jobs'])} jobs, {failed} failed, {report['workers']} workers: {format_seconds(report['seconds'])} elapsed, {format_seconds(report['job seconds'])} of job runtime")
+
+    with open(path + ".tmp", "w") as file:
+        json.dump(report, file, indent=1)
+    os.replace(path + ".tmp", path)
+    print(f"batch report written: {path}")
@@ -0,0 +1,151 @@
+"""
+Checkpoint and resume
+
+This code divides an ISM run into durable units so that a long basin-wide run can be restarted after a crash without starting over. By default, a unit holds the .mgt files
+of one subbasin; units can also be batches of a fixed number of .mgt files. When every .mgt file of a unit has been written, the unit is recorded in a completion manifest
+(manifest.json in the tmp directory) with the SHA-256 checksum of each of its .mgt files.
+
+When a run is restarted with resume = True, finished units are skipped if their .mgt files in the tmp directory still match the checksums in the manifest.
+All other units (unfinished, or modified since they were finished) are copied again from the SWAT project directory and rerun. The manifest also records a key of the run settings
+(ISM, simulation period, spin-up/calibration years and crop parameters) and of the input files (size and modification time of output.hru, the extra management operation csvs,
+the .sol files and the .mgt files of the SWAT project directory, see input_fingerprint); if the settings or input files have changed (ex., output.hru of a new SWAT simulation),
+the tmp directory is wiped and the run starts over.
+
+The manifest is rewritten atomically (written to a temporary file, then renamed) every time a unit is finished, so a crash never leaves a corrupted manifest behind.
+
+Usage in the ISMs:
+run = checkpoint.start_run(directory, tmp_directory, checkpoint.run_key("ISM", ..., checkpoint.input_fingerprint(files, directories)), resume)
+for mgt_file in run["pending"]:
+    ... write the schedule of mgt_file ...
+    checkpoint.file_done(run, mgt_file)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+from . import file_io, mgt_catalog
+
+MANIFEST = "manifest.json"
+
+
+# This code builds the key of the run settings. Any change of settings gives a different key.
+def run_key(*settings):
+    return hashlib.sha256(repr(settings).encode("utf-8")).hexdigest()
+
+
+# This code returns the fingerprint of the input files of a run, to be included in its run key: the size and modification time of every file in files, and of every file
+# with the given extension in each directory of directories (ex., {mgt_directory: ".mgt"}). Files that are not given (None) are left out.
+def input_fingerprint(files, directories={}):
+    fingerprint = []
+    for path in files:
+        if path is not None:
+            stat = os.stat(path)
+            fingerprint.append((path, stat.st_size, stat.st_mtime_ns))
+    for directory, extension in directories.items():
+        if directory is not None:
+            for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+                if entry.name.endswith(extension) and entry.is_file():
+                    stat = entry.stat()
+                    fingerprint.append((entry.path, stat.st_size, stat.st_mtime_ns))
+    return fingerprint
+
+
+# This code returns the SHA-256 checksum of a file.
+def file_checksum(path, chunk_size=1 << 20):
+    checksum = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+# This code groups the .mgt files of the catalog into units: one unit per subbasin, or one unit per batch_size .mgt files if batch_size is set.
+def plan_units(catalog, batch_size=None):
+    units = {}
+    for index, entry in enumerate(sorted(catalog, key=lambda entry: (entry["subbasin"] or 0, entry["file"]))):
+        if batch_size:
+            unit_id = f"batch_{index // batch_size:05d}"
+        else:
+            unit_id = f"subbasin_{entry['subbasin'] or 0:05d}"
+        units.setdefault(unit_id, []).append(entry["file"])
+    return units
+
+
+def load_manifest(tmp_directory):
+    path = os.path.join(tmp_directory, MANIFEST)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except ValueError:
+        return None #unreadable manifest, the run starts over
+
+
+def write_manifest(tmp_directory, manifest):
+    path = os.path.join(tmp_directory, MANIFEST)
+    with open(path + ".tmp", "w") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)
+
+
+# This code returns the SHA-256 checksums of the .mgt files of a unit, computed concurrently (see file_io.py).
+def unit_checksums(tmp_directory, mgt_files, workers=file_io.WORKERS):
+    return dict(zip(mgt_files, file_io.map_files(lambda mgt_file: file_checksum(os.path.join(tmp_directory, mgt_file)), mgt_files, workers)))
+
+
+# This code checks that the .mgt files of a finished unit still match the checksums recorded in the manifest.
+def verify_unit(tmp_directory, checksums, workers=file_io.WORKERS):
+    if not all(os.path.isfile(os.path.join(tmp_directory, mgt_file)) for mgt_file in checksums):
+        return False
+    return unit_checksums(tmp_directory, list(checksums), workers) == checksums
+
+
+# This code prepares the tmp directory for a run. Without a resumable manifest, the tmp directory is recreated and all .mgt files are copied to it.
+# Otherwise, finished units are verified and skipped, and the .mgt files of all other units are copied again from the SWAT project directory.
+# .mgt files are read, checked and copied by up to workers threads at the same time (see file_io.py).
+def start_run(directory, tmp_directory, key, resume=True, batch_size=None, workers=file_io.WORKERS):
+    catalog = mgt_catalog.build_catalog(directory, workers)
+    units = plan_units(catalog, batch_size)
+
+    manifest = load_manifest(tmp_directory) if resume else None
+    if manifest is None or manifest.get("run") != key:
+        shutil.rmtree(tmp_directory, ignore_errors = True) #deletes tmp directory if it already exists, bypasses errors if it doesn't
+        os.mkdir(tmp_directory)
+        manifest = {"run": key, "units": {}}
+
+    pending = []
+    for unit_id, mgt_files in units.items():
+        finished = manifest["units"].get(unit_id)
+        if finished and set(finished) == set(mgt_files) and verify_unit(tmp_directory, finished, workers):
+            print(f"{unit_id} already finished, skipped")
+            continue
+        manifest["units"].pop(unit_id, None)
+        pending.extend(mgt_files)
+    file_io.map_files(lambda mgt_file: shutil.copy2(os.path.join(directory, mgt_file), os.path.join(tmp_directory, mgt_file)), pending, workers) #fresh copies, discard any partially written schedule
+    write_manifest(tmp_directory, manifest)
+
+    return {
+        "tmp_directory": tmp_directory,
+        "manifest": manifest,
+        "unit_of": {mgt_file: unit_id for unit_id, mgt_files in units.items() for mgt_file in mgt_files},
+        "remaining": {unit_id: set(mgt_files) for unit_id, mgt_files in units.items() if unit_id not in manifest["units"]},
+        "units": units,
+        "pending": pending,
+        "workers": workers,
+    }
+
+
+# This code records that a .mgt file has been written. When it is the last .mgt file of its unit, the unit is recorded as finished in the manifest.
+def file_done(run, mgt_file):
+    mgt_file = os.path.basename(mgt_file)
+    unit_id = run["unit_of"][mgt_file]
+    remaining = run["remaining"][unit_id]
+    remaining.discard(mgt_file)
+    if not remaining:
+        run["manifest"]["units"][unit_id] = unit_checksums(run["tmp_directory"], run["units"][unit_id], run["workers"])
+        write_manifest(run["tmp_directory"], run["manifest"])
@@ -0,0 +1,119 @@
+"""
+Command line interface
+
+This code runs the ISMs on a SWAT project from the command line. The project settings (see project.py) are read from a JSON file given with --project,
+and/or from the command line options, which take precedence over the JSON file. With --plan, the run is only planned (see plan.py) and no .mgt file is written.
+With --archive, the scheduled .mgt files are written to a scenario archive, which is later extracted into a SWAT project folder with --extract (see scenario_archive.py).
+Without --archive, the .mgt files are written to the tmp folder of the .mgt directory, which only holds the output of one ISM, so only one ISM can be run at a time.
+With --schedule-export, the full schedule is also written as a columnar Parquet dataset (see schedule_export.py).
+With --tail, a run extending the previous tail run only schedules the days after its end date (see tail.py).
+With --batch, the ISMs are run on all SWAT projects listed in a manifest (see batch.py).
+
+Usage (from the Python folder):
+python -m isms DRIPIRR --project project.json
+python -m isms EB-SWC --directory mgt_files --sol-directory sol_files --start 2007-01-01 --end 2019-12-31 --spinup-year 2007 --calibration-year 2009
+python -m isms EB-SWC --plan --project project.json
+python -m isms AUTOIRR EB-SWC --project project.json --archive scenarios/{ism}.zip
+python -m isms DRIPIRR CON-S --project project.json --archive scenarios/{ism}.zip --schedule-export schedules
+python -m isms EB-SWC --project project.json --end 2019-07-31 --tail
+python -m isms --extract scenarios/EB-SWC.zip --into [SWAT project TxtInOut folder]
+python -m isms --batch manifest.json --workers 8
+
+Only the standard library is imported until an ISM runs.
+"""
+
+import argparse
+import json
+
+from . import ISMS
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m isms", description="Schedule irrigation operations into the .mgt files of a SWAT project with the AUTOIRR, DRIPIRR, CON-S and EB-SWC ISMs.")
+    parser.add_argument("isms", nargs="*", metavar="ISM", help="ISMs to run: " + ", ".join(ISMS))
+    parser.add_argument("--plan", action="store_true", help="only scan the inputs and print the run plan (runtime, peak memory and output size)")
+    parser.add_argument("--project", help="JSON file with the project settings")
+    parser.add_argument("--directory", help="directory of the SWAT .mgt files")
+    parser.add_argument("--output-hru", dest="output_hru", help="path to the SWAT output.hru file")
+    parser.add_argument("--sol-directory", dest="sol_directory", help="directory of the SWAT .sol files (EB-SWC)")
+    parser.add_argument("--start", help="SWAT project start date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="SWAT project end date (YYYY-MM-DD)")
+    parser.add_argument("--spinup-year", dest="spinup_year", type=int, help="SWAT spin-up start year")
+    parser.add_argument("--calibration-year", dest="calibration_year", type=int, help="SWAT calibration start year")
+    parser.add_argument("--crops", help="JSON file with the crops and associated parameters")
+    parser.add_argument("--batch-size", dest="batch_size", type=int, help="number of .mgt files per checkpoint unit (default: one unit per subbasin)")
+    parser.add_argument("--io-workers", dest="io_workers", type=int, help="number of .mgt/.sol files read or written at the same time (default: 16)")
+    parser.add_argument("--archive", help="write the scheduled .mgt files to this scenario archive (.zip) instead of the tmp folder; {ism} is replaced by the ISM name")
+    parser.add_argument("--archive-compression", dest="archive_compression", choices=["stored", "deflated", "zstd"], help="compression of the scenario archive members (default: stored)")
+    parser.add_argument("--schedule-export", dest="schedule_export", metavar="DIRECTORY", help="also write the schedule as a Parquet dataset partitioned by ISM and year into this directory (requires pyarrow)")
+    parser.add_argument("--tail", action="store_true", default=None, help="incremental tail mode: only schedule the days after the end date of the previous tail run")
+    parser.add_argument("--extract", metavar="ARCHIVE", help="extract the .mgt files of a scenario archive into the folder given by --into, and exit")
+    parser.add_argument("--into", help="SWAT project folder (TxtInOut) the scenario archive is extracted into")
+    parser.add_argument("--batch", metavar="MANIFEST", help="run the ISMs on all SWAT projects listed in a JSON manifest, and exit")
+    parser.add_argument("--workers", type=int, help="number of worker processes of a batch (default: manifest workers, or one per CPU)")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", default=None, help="discard a previous run and start over")
+    return parser
+
+
+# This code builds the project settings from the JSON file and the command line options.
+def project_from_args(args):
+    from .project import read_project_file
+
+    project = read_project_file(args.project) if args.project else {}
+    for key in ["directory", "output_hru", "sol_directory", "start", "end", "spinup_year", "calibration_year", "batch_size", "io_workers", "archive", "archive_compression", "schedule_export", "tail", "resume"]:
+        if getattr(args, key) is not None:
+            project[key] = getattr(args, key)
+    if args.crops:
+        with open(args.crops, "r") as file:
+            project["crops"] = json.load(file)
+    return project
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.extract:
+        from .scenario_archive import extract_archive
+
+        if not args.into:
+            parser.error("--extract requires --into")
+        extracted = extract_archive(args.extract, args.into, **({"workers": args.io_workers} if args.io_workers else {}))
+        print(f"{extracted['written']} of {extracted['members']} .mgt files written to {args.into}")
+        return
+    if args.batch:
+        from . import batch
+
+        jobs = batch.read_manifest(args.batch)
+        if args.workers:
+            jobs["workers"] = args.workers
+        batch.estimate_jobs(jobs["jobs"])
+        batch.write_report(batch.run_batch(jobs), jobs["report"])
+        return
+    if not args.isms:
+        parser.error("at least one ISM is required")
+    unknown = [ism for ism in args.isms if ism not in ISMS]
+    if unknown:
+        parser.error(f"unknown ISM: {', '.join(unknown)} (choose from {', '.join(ISMS)})")
+
+    project = project_from_args(args)
+
+    if args.plan:
+        from . import plan
+
+        plan.print_plan(plan.plan_run(project, args.isms))
+        return
+
+    if len(args.isms) > 1 and not project.get("archive"):
+        parser.error("the tmp folder of the .mgt directory only holds the output of one ISM; run one ISM at a time, or write a scenario archive per ISM with --archive scenarios/{ism}.zip")
+    if len(args.isms) > 1 and "{ism}" not in project["archive"]:
+        parser.error(f"all ISMs would write to the same scenario archive {project['archive']}; put {{ism}} in the archive path, ex., scenarios/{{ism}}.zip")
+
+    from . import run
+
+    for ism in args.isms:
+        print(f"running {ism}")
+        if project.get("archive"):
+            run(ism, dict(project, archive=project["archive"].format(ism=ism)))
+        else:
+            run(ism, project)
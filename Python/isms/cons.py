@@ -0,0 +1,136 @@
+"""
+CON-S ISM
+
+For every HRU and year, the crop water requirement (CWR) is determined. The CWR is calculated by summing a crop’s daily simulated
+actual evapotranspiration (AET) from SWAT. The CWR is then divided by the number of days in that HRU’s growing season to obtain a
+daily irrigation amount. This irrigation amount is continuously applied every day during the growing season, regardless of
+soil moisture content or precipitation occurrences.
+
+Irrigation is sourced from groundwater and surface water according to the established partitioning from Zamaria and Arhonditsis (2025). Users can change irrigation source and partitioning as needed.
+
+DEFS:
+sw: surface water
+gw: groundwater
+id: suggested nominal irrigation depth (mm) (OMAFRA, 2004)
+root: typical crop rooting depth (mm)(OMAFRA, 2004)
+CWR: crop water requirement (mm) caluclated as sum of simulated actual evapotranspiration of crop/HRU/year
+irr_amt: irrigation water taken from source for application (mm)
+"""
+
+import io
+
+from . import mgt_output, schedule_blocks, swat_files, tail
+
+#Crops and associated parameters to be defined by user. Users can include as many crops as applicable. Crop names should be consistent with SWAT LULC codes.
+crops = {
+    "CORN": {
+        "start mon": 5,
+        "start day": 7,
+        "end mon": 10,
+        "end day": 25,
+        "sw":  0.0,
+        "gw": 0.0,
+        "root": 600,
+        "id": 50
+    },
+    "SOYB": {
+        "start mon": 5,
+        "start day": 17,
+        "end mon": 10,
+        "end day": 15,
+        "sw": 0.0,
+        "gw": 0.0,
+        "root": 300,
+        "id": 25
+    },
+    "TOBC": {
+        "start mon": 5,
+        "start day": 17,
+        "end mon": 10,
+        "end day": 1,
+        "sw": 0.0,
+        "gw": 0.0,
+        "root": 600,
+        "id": 30
+    }
+}
+
+
+# This code reads the current SWAT project output.hru (in a tail run extending the previous one, only the rows appended since, after the ET of the current year carried over from the previous run)
+# and sums the annual actual evapotranspiration per HRU.
+def read_output_hru(run):
+    import pandas as pd
+
+    calendar = run["calendar"]
+    tail_run = run["tail"]
+    hrus = tail.read_output_hru(run["project"], tail_run)
+    et = hrus[["HRU", "YEAR", "MON", "DAY", "ETmm"]]
+    if tail_run["carried"].get("et"):
+        et = pd.concat([pd.DataFrame(tail_run["carried"]["et"]), et], ignore_index=True)
+    etsum = et.groupby(['HRU', 'YEAR'])['ETmm'].sum().reset_index() #Sums annual actual evapotranspiration per HRU.
+
+    # This code keeps the ET of the year cut short by the end date for the next tail run. The crop water requirement of a year is taken from the first HRU of etsum (see below),
+    # so only the ET of that HRU is kept, in the order of output.hru.
+    if tail_run["enabled"] and not calendar["year_end"][-1]:
+        open_year = et[(et["YEAR"] == calendar["year"][-1]) & (et["MON"] * 100 + et["DAY"] <= calendar["month"][-1] * 100 + calendar["day"][-1])]
+        if len(open_year):
+            open_year = open_year[open_year["HRU"] == open_year["HRU"].min()]
+            tail_run["state"]["et"] = {column: open_year[column].tolist() for column in open_year.columns}
+    return {"etsum": etsum, "cwr_by_year": {}} #crop water requirement of every year, found once per year
+
+
+# The code below runs the CON-S ISM algorithm for the .mgt file of an HRU. The code runs through the daily time series as set by the user and writes operation lines to the .mgt file.
+# In a tail run extending the previous one, the year of the first new day is scheduled again from its start, with the ET carried over (see tail.py).
+def schedule_hru(run, mgt_file, header):
+    calendar = run["calendar"]
+    cache = run["cache"]
+    hrus = run["hrus"]
+    subbasin = header["subbasin"]
+    crop_key = header["crop"]
+    crop = run["crops"][crop_key]
+    season = calendar["crops"][crop_key] #precomputed growing season masks of the crop
+    mgt_schedule = io.StringIO() #scheduled operation lines of all years, written to the .mgt file once the HRU is done
+    rows = [] #scheduled operation lines of all years as rows of the schedule export (see schedule_export.py)
+    irrigation = [] #irrigation lines of the current year
+
+    for i in range(run["tail"]["year_first"], len(calendar["dates"])):
+        year = calendar["year"][i]
+
+        if calendar["year_start"][i]:
+            irrigation = [] #irrigation lines (day index, IRR_SC, irrigation amount, IRR_EFM) of the year, written to the .mgt file at the end of the year
+
+        if calendar["calibration"][i]:
+            if year not in hrus["cwr_by_year"]:
+                hrus["cwr_by_year"][year] = hrus["etsum"].query(f'YEAR == {year}')["ETmm"].iloc[0] #Calculates crop water requirement per year per HRU
+            cwr = hrus["cwr_by_year"][year]
+            gs = season["season_days"][i] #number of days in the growing season
+            irr_amt = cwr/gs #calculates daily irrigation application amount per HRU
+
+            if season["in_season"][i]:
+                crop["gw"] =  round(irr_amt * 0.73, 2)  #This calculates the portion of the irrigation application sourced from groundwater. The user can omit or change this depending on where irrigation is sourced from.
+                crop["sw"] = round(irr_amt * 0.27, 2)   #This calculates the portion of the irrigation application sourced from surface water. The user can omit or change this depending on where irrigation is sourced from.
+            else:
+                crop["gw"] = 0
+                crop["sw"] = 0
+
+            #This code adds the irrigation management operation lines of the day. Note that here we have two lines:
+            #The first line has irrigation source (IRR_SC) set to 3 (sourced from shallow aquifer). The second line has irrigation source set to 1 (main channel)
+            #This is because we set each irrigation application to be sourced and partitioned from both the aquifer and the channel.
+            #Users can delete the extra line if they are only using one source, or add more if they are using more.
+            if crop["gw"] > 0:
+                irrigation.append((i, 3, crop["gw"], 0.75000))
+            if crop["sw"] > 0:
+                irrigation.append((i, 1, crop["sw"], 0.75000))
+
+        if calendar["year_end"][i]:
+            # This code adds the management schedule of the year to the schedule of the .mgt file: the irrigation lines, and the pre-rendered scheduled operation lines
+            # for all management operations other than irrigation before the irrigation lines of the same day.
+            extra_block = schedule_blocks.get_block(cache, (crop_key, year, None), lambda: swat_files.render_extra_ops(calendar, run["extra_ops"][crop_key], year))
+            swat_files.write_year(mgt_schedule, calendar, subbasin, extra_block, irrigation, rows)
+
+    return mgt_schedule.getvalue(), rows, {}
+
+
+# This code runs the CON-S ISM over all .mgt files of a SWAT project (see project.py for the project settings).
+def run(project):
+    mgt_output.run_ism(project, "CON-S", crops, schedule_hru, read_output_hru)
@@ -0,0 +1,90 @@
+"""
+Crop calendar
+
+This code precomputes the simulation calendar shared by the AUTOIRR, DRIPIRR, CON-S and EB-SWC ISMs. Previously every ISM built the crop's planting and harvesting dates
+for every day of the simulation period and for every HRU. Here, the calendar is built once per crop and simulation period as boolean masks and day-index ranges
+that the ISMs can index or slice directly.
+
+The calendar is a dictionary with:
+dates: every day of the simulation period (numpy datetime64[D] array)
+year, month, day: calendar fields for every day of the simulation period
+new_year: True on the days where the calendar year differs from the previous day (or from the SWAT spin-up start year on the first day)
+year_start: True on January 1st
+year_end: True on December 31st
+calibration: True on the days falling in or after the SWAT calibration start year
+years: day-index range (start, stop) of every calendar year; dates[start:stop] are the days of that year
+crops: one season calendar per crop (see season_calendar)
+
+DEFS:
+in_season: True on the days between the crop's planting and harvesting dates (inclusive)
+season_start: True on the crop's planting date
+season_days: number of days between the crop's planting and harvesting dates for that day's year
+seasons: list of (year, start index, stop index) day-index ranges of each growing season; dates[start:stop] is the growing season of that year
+
+Only numpy is needed (imported when a calendar is built), so the calendar can be used by the run planner without importing pandas.
+"""
+
+
+# This code returns every day between the SWAT project start and end dates (inclusive), like pandas.date_range.
+def date_range(start, end):
+    import numpy as np
+
+    return np.arange(np.datetime64(str(start)[:10], "D"), np.datetime64(str(end)[:10], "D") + 1)
+
+
+# This code builds the season calendar of a single crop over the simulation period. Planting and harvesting dates are built once per year instead of once per day.
+def season_calendar(dates, crop):
+    import numpy as np
+
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    years = dates.astype("datetime64[Y]").astype(int) + 1970
+    in_season = np.zeros(len(dates), dtype=bool)
+    season_start = np.zeros(len(dates), dtype=bool)
+    season_days = np.zeros(len(dates), dtype=int)
+    seasons = []
+
+    for year in np.unique(years):
+        start_date = np.datetime64(f"{year:04d}-{crop['start mon']:02d}-{crop['start day']:02d}", "D")
+        end_date = np.datetime64(f"{year:04d}-{crop['end mon']:02d}-{crop['end day']:02d}", "D")
+        start = int(np.searchsorted(dates, start_date, side="left")) #first day index on or after planting
+        stop = int(np.searchsorted(dates, end_date, side="right")) #first day index after harvesting
+
+        in_season[start:stop] = True
+        if start < len(dates) and dates[start] == start_date:
+            season_start[start] = True
+        season_days[years == year] = int((end_date - start_date).astype(int))
+        seasons.append((int(year), start, stop))
+
+    return {
+        "in_season": in_season,
+        "season_start": season_start,
+        "season_days": season_days,
+        "seasons": seasons,
+    }
+
+
+# This code builds the calendar shared by all HRUs over the simulation period. spinup_year is the SWAT spin-up start year and calibration_year is the SWAT calibration start year.
+def build_calendar(dates, crops, spinup_year, calibration_year):
+    import numpy as np
+
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    years = dates.astype("datetime64[Y]").astype(int) + 1970
+    month_starts = dates.astype("datetime64[M]")
+    months = month_starts.astype(int) % 12 + 1
+    days = (dates - month_starts.astype("datetime64[D]")).astype(int) + 1
+    previous_years = np.concatenate(([spinup_year], years[:-1]))
+    unique_years, year_starts = np.unique(years, return_index=True)
+    year_stops = np.append(year_starts[1:], len(dates))
+
+    return {
+        "dates": dates,
+        "year": years,
+        "month": months,
+        "day": days,
+        "new_year": years != previous_years,
+        "year_start": (months == 1) & (days == 1),
+        "year_end": (months == 12) & (days == 31),
+        "calibration": years >= calibration_year,
+        "years": {int(year): (int(start), int(stop)) for year, start, stop in zip(unique_years, year_starts, year_stops)},
+        "crops": {crop_key: season_calendar(dates, crop) for crop_key, crop in crops.items()},
+    }
@@ -0,0 +1,121 @@
+"""
+DRIPIRR ISM
+
+During the growing season, daily irrigation applied to an HRU is equal to that day's simulated transpiration from the HRU's dominant crop.
+Transpiration is estimated from simulated potential evapotranspiration using an empircal equation from Ritchie and Burnett (1971).
+Given daily transpiration > 0, irrigation is applied daily.
+Irrigation is sourced from groundwater and surface water according to the established partitioning. Users can change irrigation source and partitioning as needed.
+
+DEFS
+sw: surface water
+gw: groundwater
+id: suggested nominal irrigation depth (mm) (OMAFRA, 2004)
+root: typical crop rooting depth (mm)(OMAFRA, 2004)
+irr_amt: irrigation water applied
+PET: potential evapotranspiration
+LAI: leaf area index
+"""
+
+import io
+
+from . import mgt_output, schedule_blocks, swat_files, tail
+
+#Crops and associated parameters to be defined by user. Users can include as many crops as applicable. Crop names should be consistent with SWAT LULC codes.
+crops = {
+    "CORN": {
+        "start mon": 5,
+        "start day": 7,
+        "end mon": 10,
+        "end day": 25,
+        "sw":  0.0,
+        "gw": 0.0,
+        "root": 600,
+        "id": 50
+    },
+    "SOYB": {
+        "start mon": 5,
+        "start day": 17,
+        "end mon": 10,
+        "end day": 15,
+        "sw": 0.0,
+        "gw": 0.0,
+        "root": 300,
+        "id": 25
+    },
+    "TOBC": {
+        "start mon": 5,
+        "start day": 17,
+        "end mon": 10,
+        "end day": 1,
+        "sw": 0.0,
+        "gw": 0.0,
+        "root": 600,
+        "id": 30
+    }
+}
+
+
+# This code reads the current SWAT project output.hru (in a tail run extending the previous one, only the rows appended since).
+def read_output_hru(run):
+    return tail.read_output_hru(run["project"], run["tail"])
+
+
+# The code below runs the DRIPIRR ISM algorithm for the .mgt file of an HRU. The code runs through the daily time series as set by the user and writes operation lines to the .mgt file.
+def schedule_hru(run, mgt_file, header):
+    calendar = run["calendar"]
+    cache = run["cache"]
+    hruno = header["hruno"]
+    subbasin = header["subbasin"]
+    crop_key = header["crop"]
+    crop = run["crops"][crop_key]
+    season = calendar["crops"][crop_key] #precomputed growing season masks of the crop
+    mgt_schedule = io.StringIO() #scheduled operation lines of all years, written to the .mgt file once the HRU is done
+    rows = [] #scheduled operation lines of all years as rows of the schedule export (see schedule_export.py)
+    irrigation = [tuple(line) for line in header["state"].get("irrigation", [])] #irrigation lines of the current year; a tail run carries over the lines of the year scheduled by the previous run
+
+    for i in range(run["first"], len(calendar["dates"])):
+        year = calendar["year"][i]
+        month = calendar["month"][i]
+        day = calendar["day"][i]
+
+        if calendar["year_start"][i]:
+            irrigation = [] #irrigation lines (day index, IRR_SC, irrigation amount, IRR_EFM) of the year, written to the .mgt file at the end of the year
+
+        # This code estimates crop transpiration from simulated potential evapotranspiration and leaf area index using the Ritchie and Burnett equation (1971)
+        if calendar["calibration"][i]:
+            if season["in_season"][i]:
+                PET = run["hrus"].query(f'MON == {month} and DAY == {day} and YEAR == {year} and HRU == {hruno}')["PETmm"].iloc[0] #Finds daily potential evapotranspiration
+                LAI = run["hrus"].query(f'MON == {month} and DAY == {day} and YEAR == {year} and HRU == {hruno}')["LAI"].iloc[0] #Finds daily LAI
+                if LAI >= 0.1: # and LAI <=2.7:  <<-- USE THIS WHEN CONSIDERING UPPER LAI LIMIT
+                    Transpiration = PET*(-0.21 + 0.70*LAI**0.5)
+                    irr_amt = Transpiration
+                    crop["gw"] =  round(irr_amt * 0.73, 2)
+                    crop["sw"] = round(irr_amt * 0.27, 2)
+
+                # If no transpiration occurs, irrigation is not applied
+                else:
+                    crop["gw"] = 0
+                    crop["sw"] = 0
+
+            #This code adds the irrigation management operation lines of the day. Note that here we have two lines:
+            #The first line has irrigation source (IRR_SC) set to 3 (sourced from shallow aquifer). The second line has irrigation source set to 1 (main channel)
+            #This is because we set each irrigation application to be sourced and partitioned from both the aquifer and the channel.
+            #Users can delete the extra line if they are only using one source, or add more if they are using more.
+                if crop["gw"] > 0:
+                    irrigation.append((i, 3, crop["gw"], 0.75000))
+                if crop["sw"] > 0:
+                    irrigation.append((i, 1, crop["sw"], 0.75000))
+
+        if calendar["year_end"][i]:
+            # This code adds the management schedule of the year to the schedule of the .mgt file: the irrigation lines, and the pre-rendered scheduled operation lines
+            # for all management operations other than irrigation before the irrigation lines of the same day.
+            extra_block = schedule_blocks.get_block(cache, (crop_key, year, None), lambda: swat_files.render_extra_ops(calendar, run["extra_ops"][crop_key], year))
+            swat_files.write_year(mgt_schedule, calendar, subbasin, extra_block, irrigation, rows)
+            print(mgt_file)
+
+    return mgt_schedule.getvalue(), rows, {"irrigation": [] if calendar["year_end"][-1] else irrigation} #irrigation lines of the year cut short by the end date
+
+
+# This code runs the DRIPIRR ISM over all .mgt files of a SWAT project (see project.py for the project settings).
+def run(project):
+    mgt_output.run_ism(project, "DRIPIRR", crops, schedule_hru, read_output_hru)
@@ -0,0 +1,194 @@
+"""
+EB-SWC ISM
+
+The first irrigation event of the growing season for an HRU is triggered when the corresponding daily soil moisture content is less than or equal to the allowable soil water depletion threshold (AWD).
+The AWD is assumed to be 50% of the HRU’s available soil water content (AWC), which is equal to the field capacity of that HRU’s dominant crop. Subsequently, the dominant crop’s recommended nominal irrigation depth for every HRU
+is applied at the recommended nominal irrigation interval. On a scheduled irrigation application day, if the soil moisture content is greater than the AWD, irrigation is not applied, and the next irrigation event is triggered
+by the next occurrence of the daily soil moisture content falling below the AWD. Total irrigation applied per crop is not constrained by the crop water requirement.
+
+This algorithm has to follow a set irrigation schedule based on recommended irrigation interval since soil water content in SWAT cannot be dynamically updated as irrigation is applied. Irrigating solely on SWC, then, will cause the model to over-irrigate.
+
+Irrigation is sourced from groundwater and surface water according to the established partitioning. Users can change irrigation source and partitioning as needed.
+
+The irrigation events are found directly from each HRU's daily soil water content (see find_events): instead of walking every day of the growing season, the scheduler jumps
+from one irrigation event to the next, so the cost per HRU is proportional to the number of irrigation events.
+
+DEFS:
+.sol: soil parameter input files
+sw: surface water
+gw: groundwater
+id: suggested nominal irrigation depth (mm) (OMAFRA, 2004)
+root: typical crop rooting depth (mm)(OMAFRA, 2004)
+interval: suggested irrigation interval (OMAFRA, 2004)
+SOL_AWC: available soil water content parameter (mm water/mm soil)
+AWD: allowable soil water depletion threshold
+AWC: available soil water content (mm) that = field capacity/crop
+SWend: simulated soil water content (mm) at the end of every day
+irr_event_no: count of irrigation events
+irr_amt: irrigation water taken from source for application (mm)
+"""
+
+import io
+import math
+import os
+
+from . import mgt_output, schedule_blocks, swat_files, tail
+
+# output.hru columns read by EB-SWC
+HRU_USECOLS = [0,1,3,5,6,7,8,9,12,13,14,15,16,21,22]
+HRU_COLUMNS = ["LULC","HRU","SUB","MON","DAY","YEAR", "AREAkm2","PRECIPmm","IRRmm","PETmm","ETmm","SW_INITmm","SW_ENDmm","SA_IRRmm","DA_IRRmm"]
+
+#Crops and associated parameters to be defined by user. Users can include as many crops as applicable. Crop names should be consistent with SWAT LULC codes.
+crops = {
+    "CORN": {
+        "start mon": 5,
+        "start day": 7,
+        "end mon": 10,
+        "end day": 25,
+        "sw":  0.0,
+        "gw": 0.0,
+        "root": 600,
+        "interval": 14,
+        "id": 50
+    },
+    "SOYB": {
+        "start mon": 5,
+        "start day": 17,
+        "end mon": 10,
+        "end day": 15,
+        "sw": 0.0,
+        "gw": 0.0,
+        "root": 300,
+        "interval": 7,
+        "id": 25
+    },
+    "TOBC": {
+        "start mon": 5,
+        "start day": 17,
+        "end mon": 10,
+        "end day": 1,
+        "sw": 0.0,
+        "gw": 0.0,
+        "root": 600,
+        "interval": 7,
+        "id": 30
+    }
+}
+
+
+# This code finds the irrigation events of an HRU without walking every day of the simulation period. SWend is the HRU's daily soil water content (mm) and eligible marks the days
+# the algorithm runs through (growing season days after the calibration start year). day_count, the running count of eligible days since the last irrigation event, and irr_event_no,
+# the running count of irrigation events, carry over from one growing season to the next.
+# 1. The first irrigation event is the first eligible day where SWend <= AWD.
+# 2. Each following irrigation event is the first eligible day where SWend <= AWD, at least interval eligible days after the last irrigation event. Eligible days with
+#    SWend > AWD in between are skipped ("irrigation skipped").
+# Eligible days are numbered in order, and the numbers of the eligible days with SWend <= AWD are searched for the earliest number allowed by the interval, so the cost per HRU is
+# proportional to the number of irrigation events instead of the number of days.
+# day_count and irr_event_no are the counts at the start of the days given (carried over from the previous run of a tail run, see tail.py). Returns the day indices of the irrigation
+# events, and day_count and irr_event_no at the end of the days given.
+def find_events(SWend, eligible, AWD, interval, day_count=0, irr_event_no=0):
+    import numpy as np
+
+    eligible_days = np.flatnonzero(eligible) #day index of every eligible day
+    below_awd = np.flatnonzero(SWend[eligible_days] <= AWD) #numbers of the eligible days where SWend <= AWD
+    step = max(math.ceil(interval), 1) #eligible days from an irrigation event to the earliest next one (day_count >= interval)
+
+    events = []
+    earliest = max(step - day_count - 1, 0) if irr_event_no else 0 #the first eligible day counts day_count + 1 days since the last irrigation event
+    while True:
+        k = np.searchsorted(below_awd, earliest)
+        if k == len(below_awd):
+            break
+        events.append(int(eligible_days[below_awd[k]]))
+        day_count = len(eligible_days) - 1 - int(below_awd[k]) #eligible days after the irrigation event
+        earliest = below_awd[k] + step
+    if not events:
+        day_count += len(eligible_days)
+    return events, day_count, irr_event_no + len(events)
+
+
+# This code reads the current SWAT project output.hru (in a tail run extending the previous one, only the rows appended since), and arranges the simulated soil water content (mm)
+# at the end of every day as one daily array per HRU over the days from first on
+def read_output_hru(run):
+    hrus = tail.read_output_hru(run["project"], run["tail"], usecols=HRU_USECOLS, columns=HRU_COLUMNS)
+    return swat_files.daily_values(hrus, run["calendar"]["dates"][run["first"]:], "SW_ENDmm")
+
+
+# This code reads the .sol input file of an HRU to find its SOL_AWC, averaged across all soil layers for calculating AWD later. A tail run carries over the SOL_AWC found by the previous run.
+def read_hru(run, mgt_file, header):
+    if "SOL_AWC" in header["state"]:
+        header["SOL_AWC"] = header["state"]["SOL_AWC"]
+    else:
+        header["SOL_AWC"] = swat_files.read_sol_awc(os.path.join(run["project"]["sol_directory"], os.path.basename(mgt_file).replace(".mgt", ".sol")))
+
+
+# The code below runs the EB-SWC ISM algorithm for the .mgt file of an HRU. The irrigation events of the HRU are found directly from its daily soil water content (see find_events),
+# and the operation lines of every year are written to the .mgt file.
+def schedule_hru(run, mgt_file, header):
+    import numpy as np
+
+    calendar = run["calendar"]
+    cache = run["cache"]
+    first = run["first"]
+    sw_rows, sw_end = run["hrus"]
+    hruno = header["hruno"]
+    subbasin = header["subbasin"]
+    crop_key = header["crop"]
+    crop = run["crops"][crop_key]
+    season = calendar["crops"][crop_key] #precomputed growing season masks of the crop
+    mgt_schedule = io.StringIO() #scheduled operation lines of all years, written to the .mgt file once the HRU is done
+    rows = [] #scheduled operation lines of all years as rows of the schedule export (see schedule_export.py)
+    state = header["state"] #day_count, irr_event_no and the irrigation lines of the current year, carried over from the previous run of a tail run
+
+    # This code calculates the AWC per HRU by multiplying each HRU's average SOL_AWC by the predominant crop's rooting depth
+    AWC = header["SOL_AWC"] * crop["root"]
+    #This code calculates the AWD per HRU by halving the AWC
+    AWD = AWC * 0.50
+
+    #This code reads the HRU's soil water content (mm) at the end of every day in the time series, on the days the algorithm runs through (growing season days after the calibration start year)
+    eligible = (season["in_season"] & calendar["calibration"])[first:]
+    SWend = sw_end[sw_rows[hruno]] if hruno in sw_rows else np.full(len(calendar["dates"]) - first, np.nan)
+    missing = np.flatnonzero(eligible & np.isnan(SWend))
+    if len(missing):
+        raise ValueError(f"output.hru has no SW_ENDmm for HRU {hruno} on {calendar['dates'][first + missing[0]]}")
+
+    # This code finds the irrigation lines (day index, IRR_SC, irrigation amount, IRR_EFM) of every irrigation event
+    irrigation = [tuple(line) for line in state.get("irrigation", [])]
+    events, day_count, irr_event_no = find_events(SWend, eligible, AWD, crop["interval"], state.get("day_count", 0), state.get("irr_event_no", 0))
+    for event in events:
+        # Applies BMP-recommended nominal irrigation depth if AWC-SWend is greater than the recommended irrigation depth, or irrigation depth equal to AWC - SWend otherwise
+        if AWC - SWend[event] > crop["id"]:
+            irr_amt = crop["id"]
+        else:
+            irr_amt = AWC - SWend[event]
+        crop["gw"] =  round(irr_amt * 0.73, 2) #This calculates the portion of the irrigation application sourced from groundwater. The user can omit or change this depending on where irrigation is sourced from.
+        crop["sw"] = round(irr_amt * 0.27, 2) #This calculates the portion of the irrigation application sourced from surface water. The user can omit or change this depending on where irrigation is sourced from.
+
+        #This code adds the irrigation management operation lines of the irrigation event. Note that here we have two lines:
+        #The first line has irrigation source (IRR_SC) set to 3 (sourced from shallow aquifer). The second line has irrigation source set to 1 (main channel)
+        #This is because we set each irrigation application to be sourced and partitioned from both the aquifer and the channel.
+        #Users can delete the extra line if they are only using one source, or add more if they are using more.
+        if crop["gw"] > 0:
+            irrigation.append((first + event, 3, crop["gw"], 0.75000))
+        if crop["sw"] > 0:
+            irrigation.append((first + event, 1, crop["sw"], 0.75000))
+    crop["gw"] = 0
+    crop["sw"] = 0
+
+    for year, (year_start, year_stop) in calendar["years"].items():
+        # The management schedule of a year is written at the end of the year (December 31st); a year cut short by the project end date is not written,
+        # and a tail run does not write the years written by the previous run again.
+        if year_stop <= first or not calendar["year_end"][year_stop - 1]:
+            continue
+        # This code adds the irrigation lines of the year, and the pre-rendered scheduled operation lines for all management operations other than irrigation after the irrigation lines of the same day
+        extra_block = schedule_blocks.get_block(cache, (crop_key, year, None), lambda: swat_files.render_extra_ops(calendar, run["extra_ops"][crop_key], year))
+        swat_files.write_year(mgt_schedule, calendar, subbasin, extra_block, [line for line in irrigation if year_start <= line[0] < year_stop], rows, irrigation_first=True)
+
+    print(f"{mgt_file}: {len(events)} irrigation events")
+    open_start = len(calendar["dates"]) if calendar["year_end"][-1] else calendar["years"][int(calendar["year"][-1])][0] #start of the year cut short by the end date
+    return mgt_schedule.getvalue(), rows, {"SOL_AWC": header["SOL_AWC"], "day_count": day_count, "irr_event_no": irr_event_no, "irrigation": [line for line in irrigation if line[0] >= open_start]}
+
+
+# This code runs the EB-SWC ISM over all .mgt files of a SWAT project (see project.py for the project settings). The .sol files are read from the project's sol_directory.
+def run(project):
+    mgt_output.run_ism(project, "EB-SWC", crops, schedule_hru, read_output_hru, read_hru, {"sol_directory": ".sol"})
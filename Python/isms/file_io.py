@@ -0,0 +1,102 @@
+"""
+Concurrent project file I/O
+
+A SWAT project holds one .mgt file and one .sol file per HRU. When the project directory sits on a network share or object-backed storage, opening thousands of small files
+one after another makes a basin-wide run latency-bound: the ISMs spend most of their time waiting on file round trips rather than computing schedules. This code overlaps the
+round trips with each other, and with the ISM computation, using a bounded thread pool:
+1. map_files applies a file operation (reading a .mgt header, copying a .mgt file, computing a checksum) to many files concurrently and returns the results in input order
+2. prefetch reads the files of the next HRUs while the ISM computes the schedule of the current HRU, keeping at most `window` files read ahead
+3. the writer writes the generated .mgt files in the background. A .mgt file is reported done (on_done) only once its write has completed, in the order the writes were
+   submitted, so checkpoints (see checkpoint.py) never record a file that is not on disk yet
+
+workers bounds the number of files open at any time. With workers = 1, files are read and written one after another in the calling thread, as the ISMs originally did.
+
+Usage (see mgt_output.run_ism):
+writer = file_io.start_writer(lambda mgt_file: checkpoint.file_done(progress, mgt_file), workers)
+for mgt_file, header in file_io.prefetch(mgt_files, swat_files.read_schedule, workers):
+    ... compute the schedule of mgt_file ...
+    file_io.submit_write(writer, mgt_file, swat_files.write_schedule, mgt_file, header["position"], schedule, header["newline"])
+file_io.finish_writer(writer)
+"""
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+WORKERS = 16 #default number of files read or written at the same time
+WINDOW = 64 #default number of files read ahead of, or written behind, the ISM computation
+
+
+# This code applies function to every item concurrently and returns the results in input order.
+def map_files(function, items, workers=WORKERS):
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(function, items))
+
+
+# This code yields (item, read(item)) for every item in input order, while the next items are read in the background.
+def prefetch(items, read, workers=WORKERS, window=WINDOW):
+    if workers <= 1:
+        for item in items:
+            yield item, read(item)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    queue = collections.deque()
+    try:
+        for item in items:
+            queue.append((item, pool.submit(read, item)))
+            if len(queue) > window:
+                item, future = queue.popleft()
+                yield item, future.result()
+        while queue:
+            item, future = queue.popleft()
+            yield item, future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True) #reads still queued are dropped if the ISM stops early
+
+
+# This code starts a background writer. on_done(key) is called in the calling thread once the write of key has completed.
+def start_writer(on_done=None, workers=WORKERS, window=WINDOW):
+    return {
+        "pool": ThreadPoolExecutor(max_workers=workers) if workers > 1 else None,
+        "queue": collections.deque(),
+        "on_done": on_done,
+        "window": window,
+    }
+
+
+# This code submits write(*args) to the writer. Without write, key is only reported done, in order with the writes submitted before it.
+def submit_write(writer, key, write=None, *args):
+    if writer["pool"] is None or write is None and not writer["queue"]:
+        if write is not None:
+            write(*args)
+        if writer["on_done"]:
+            writer["on_done"](key)
+        return
+    writer["queue"].append((key, writer["pool"].submit(write, *args) if write is not None else None))
+    collect_writes(writer, wait=len(writer["queue"]) > writer["window"])
+
+
+# This code reports the writes that have completed, in submission order. With wait, it blocks until the oldest write has completed.
+# A failed write raises its error in the calling thread.
+def collect_writes(writer, wait=False):
+    queue = writer["queue"]
+    while queue and (wait or queue[0][1] is None or queue[0][1].done()):
+        key, future = queue.popleft()
+        if future is not None:
+            future.result()
+        if writer["on_done"]:
+            writer["on_done"](key)
+        wait = False
+
+
+# This code waits for all writes to complete and stops the writer.
+def finish_writer(writer):
+    try:
+        while writer["queue"]:
+            collect_writes(writer, wait=True)
+    finally:
+        if writer["pool"] is not None:
+            writer["pool"].shutdown(wait=True)
@@ -0,0 +1,55 @@
+"""
+.mgt header catalog
+
+This code reads the header line of every SWAT .mgt file in a directory without reading the rest of the file. The header line written by ArcSWAT holds the watershed HRU number,
+the subbasin, the HRU number within the subbasin and the land use of the HRU, for example:
+ .mgt file Watershed HRU:1 Subbasin:1 HRU:1 Luse:CORN Soil: 1234 Slope: 0-2 3/4/2020 12:00:00 AM ArcSWAT 2012.10_4.19
+
+The catalog is a list with one dictionary per .mgt file, sorted by file name.
+
+DEFS:
+file: .mgt file name
+hru: first HRU number found in the header (same search as the ISMs)
+hruno: watershed HRU number, as found in output.hru
+subbasin: subbasin number
+crop: land use (SWAT LULC code) of the HRU
+newline: line ending of the .mgt file ("\r\n" in .mgt files written by ArcSWAT)
+"""
+
+import os
+import re
+
+from . import file_io
+
+
+# This code reads the header of a single .mgt file and returns its catalog entry.
+def read_mgt_header(mgt_file):
+    with open(mgt_file, "r") as file:
+        header = file.readline()
+        newline = file.newlines or "\n" #line ending of the header line
+    hru = re.search(r"(?<=HRU\:)\d+", header)
+    hruno = re.search(r"(?<=Watershed HRU\:)\d+", header)
+    subbasin = re.search(r"(?<=Subbasin\:)\d+", header)
+    crop_key = re.search(r"(?<=Luse\:)[A-Z]+", header)
+    return {
+        "file": os.path.basename(mgt_file),
+        "hru": int(hru[0]) if hru else None,
+        "hruno": int(hruno[0]) if hruno else None,
+        "subbasin": int(subbasin[0]) if subbasin else None,
+        "crop": crop_key[0] if crop_key else None,
+        "newline": newline,
+    }
+
+
+# This code builds the catalog of all .mgt files in a directory. The headers are read by up to workers threads at the same time (see file_io.py).
+def build_catalog(directory, workers=file_io.WORKERS):
+    mgt_files = sorted(entry.name for entry in os.scandir(directory) if entry.name.endswith(".mgt") and entry.is_file()) #scandir lists file types without one stat per file
+    return file_io.map_files(read_mgt_header, [os.path.join(directory, f) for f in mgt_files], workers)
+
+
+# This code counts the HRUs of every land use in the catalog.
+def hrus_per_crop(catalog):
+    counts = {}
+    for entry in catalog:
+        counts[entry["crop"]] = counts.get(entry["crop"], 0) + 1
+    return counts
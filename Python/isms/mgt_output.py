@@ -0,0 +1,206 @@
+"""
+ISM output
+
+This code decides where the .mgt files with the ISM schedule are written:
+1. By default, the .mgt files are copied to the tmp subfolder of the .mgt directory and the schedule is written into the copies. The run is checkpointed per unit (see checkpoint.py).
+2. If the project sets an archive, the .mgt files are read from the .mgt directory and the scheduled .mgt files are streamed into a single scenario archive (see scenario_archive.py).
+   No tmp folder is created.
+3. In tail mode, a run extending the previous tail run appends the operation lines of the new days to the .mgt files of the tmp subfolder (see tail.py).
+If the project sets a schedule_export directory, the scheduled operation lines are also written as a columnar dataset (see schedule_export.py).
+
+The ISMs are run by run_ism, which holds the steps shared by all four ISMs: reading the project settings and extra management operations, building the crop calendar,
+fingerprinting the input files (see checkpoint.py), starting the tail run (see tail.py) and the output, and reading, scheduling and writing every .mgt file (see file_io.py).
+Each ISM only gives the callbacks of its algorithm, for example:
+
+def read_output_hru(run):
+    return tail.read_output_hru(run["project"], run["tail"]) #output.hru, or the data derived from it, kept in run["hrus"]
+
+def schedule_hru(run, mgt_file, header):
+    ... compute the schedule of the HRU, its rows (see schedule_export.py) and its state at the end of the run (see tail.py) ...
+    return schedule, rows, state
+
+def run(project):
+    mgt_output.run_ism(project, "DRIPIRR", crops, schedule_hru, read_output_hru)
+"""
+
+import os
+
+from . import checkpoint, crop_calendar, file_io, mgt_catalog, scenario_archive, schedule_blocks, schedule_export, swat_files, tail
+from .project import load_project
+
+
+# This code runs an ISM over all .mgt files of a SWAT project (see project.py for the project settings). crops are the default crop parameters of the ISM. The ISM algorithm is given by callbacks,
+# which get the run dictionary (settings, extra management operations, crop calendar, tail run, output and schedule block cache of the run):
+# read_output_hru(run): reads output.hru (see tail.read_output_hru) and returns the data of the ISM kept in run["hrus"]. ISMs that do not read output.hru (AUTOIRR) give None,
+# and output.hru is then left out of the run key.
+# read_hru(run, mgt_file, header): reads the input files of an HRU other than its .mgt file (ex., its .sol file) into header, ahead of the computation with the .mgt file.
+# schedule_hru(run, mgt_file, header): returns the schedule of an HRU with a crop of the ISM, its rows (see schedule_export.py) and its state at the end of the run (see tail.py).
+# directories are the project settings of the input directories read by the ISM other than the .mgt directory, with the extension of their files (ex., {"sol_directory": ".sol"}).
+def run_ism(project, ism, crops, schedule_hru, read_output_hru=None, read_hru=None, directories={}):
+    project = load_project(project, crops)
+    crop_table = project["crops"]
+
+    #Each crop will also have additional scheduled management operations that are not irrigation. The data is read here and later integrated with the ISM schedule by date.
+    extra_ops = swat_files.read_extra_ops(project["extra_ops"])
+
+    # This code builds the simulation calendar once for all HRUs: the daily time series, the growing season of every crop, and the spin-up/calibration years.
+    dates = crop_calendar.date_range(project["start"], project["end"])
+    calendar = crop_calendar.build_calendar(dates, crop_table, project["spinup_year"], project["calibration_year"])
+
+    # This code fingerprints the input files (see checkpoint.py), so a rerun after the inputs have changed (ex., a new SWAT simulation) starts over instead of skipping finished units.
+    inputs = checkpoint.input_fingerprint(list(project["extra_ops"].values()), {project["directory"]: ".mgt", **{project[setting]: extension for setting, extension in directories.items()}})
+
+    # In tail mode, a run extending the previous tail run only schedules the days from first on (see tail.py).
+    tail_run = tail.start_tail(project, ism, calendar, crop_table, inputs)
+    run = {
+        "ism": ism,
+        "project": project,
+        "crops": crop_table,
+        "extra_ops": extra_ops,
+        "calendar": calendar,
+        "tail": tail_run,
+        "first": tail_run["first"],
+        "hrus": None,
+        "cache": schedule_blocks.new_cache(),
+    }
+    key = [ism, dates[0], dates[-1], project["spinup_year"], project["calibration_year"], crop_table, inputs]
+    if read_output_hru is not None:
+        run["hrus"] = read_output_hru(run)
+        key.append(checkpoint.input_fingerprint([project["output_hru"]]))
+
+    # This code prepares the output: the tmp directory (units (subbasins) finished by a previous run with the same settings and input files are skipped, and the .mgt files of all other units are copied to it),
+    # or the scenario archive.
+    output = start_output(project, checkpoint.run_key(*key), ism, calendar, tail_run)
+    run["output"] = output
+    workers = project["io_workers"]
+    writer = file_io.start_writer(lambda mgt_file: file_done(output, mgt_file), workers) #records the unit as finished once all of its .mgt files are written
+
+    # This code reads the .mgt header of an HRU, and its other input files.
+    def read_inputs(mgt_file):
+        header = read_schedule(output, mgt_file)
+        if read_hru is not None:
+            read_hru(run, mgt_file, header)
+        return header
+
+    # This code loops through each .mgt file in the pre-determined directory. The input files are read ahead of, and the .mgt files written behind, the ISM computation (see file_io.py).
+    for mgt_file, header in file_io.prefetch(output["pending"], read_inputs, workers):
+        if header["crop"] in crop_table.keys(): # only runs if crop is in crops list (tobc, corn, soyb)
+            schedule, rows, state = schedule_hru(run, mgt_file, header)
+            add_rows(output, mgt_file, header, rows)
+            record_state(output, mgt_file, header, state)
+        else:
+            schedule = None #the HRU is not scheduled, the .mgt file is kept unchanged
+        file_io.submit_write(writer, mgt_file, write_schedule, output, mgt_file, header, schedule)
+    file_io.finish_writer(writer)
+    finish_output(output)
+
+    print(schedule_blocks.cache_stats(run["cache"]))
+    print("done all")
+
+
+# This code prepares the output of an ISM run and returns the .mgt files to schedule.
+def start_output(project, key, ism, calendar, tail_run):
+    directory = project["directory"]
+    workers = project["io_workers"]
+
+    if tail_run["previous"] is not None:
+        hrus = tail_run["previous"]["hrus"] #the .mgt files scheduled by the previous tail run are extended in place
+        output = {
+            "archive": None,
+            "progress": None,
+            "pending": [os.path.join(tail_run["tmp_directory"], mgt_file) for mgt_file in hrus],
+        }
+        unit_of = {mgt_file: entry["unit"] for mgt_file, entry in hrus.items()}
+        skipped = []
+    elif project["archive"] is None:
+        tmp_directory = swat_files.tmp_directory(directory)
+        resume = project["resume"] and not tail_run["enabled"] #a tail run records the state of every HRU, so it does not skip units finished by a crashed run
+        progress = checkpoint.start_run(directory, tmp_directory, key, resume, project["batch_size"], workers)
+        output = {
+            "archive": None,
+            "progress": progress,
+            "pending": [os.path.join(tmp_directory, mgt_file) for mgt_file in progress["pending"]],
+        }
+        unit_of = progress["unit_of"]
+        skipped = [unit_id for unit_id in progress["units"] if unit_id not in progress["remaining"]]
+    else:
+        catalog = mgt_catalog.build_catalog(directory, workers)
+        units = checkpoint.plan_units(catalog, project["batch_size"]) #same order of .mgt files as a checkpointed run
+        output = {
+            "archive": scenario_archive.open_archive(project["archive"], key, project["archive_compression"]),
+            "progress": None,
+            "pending": [os.path.join(directory, mgt_file) for mgt_files in units.values() for mgt_file in mgt_files],
+        }
+        unit_of = {mgt_file: unit_id for unit_id, mgt_files in units.items() for mgt_file in mgt_files}
+        skipped = []
+
+    output["key"] = key
+    output["unit_of"] = unit_of
+    output["tail"] = tail_run
+    output["export"] = None
+    if project["schedule_export"]:
+        export_units, previous_key = unit_of, None
+        if tail_run["previous"] is not None: #the rows of the new days are added to the export of the previous tail run, in new files named by unit and first new day
+            first_date = tail_run["end"] if tail_run["first"] == len(calendar["dates"]) else str(calendar["dates"][tail_run["first"]])
+            export_units = {mgt_file: f"{unit_id}.{first_date}" for mgt_file, unit_id in unit_of.items()}
+            previous_key = tail_run["previous"]["key"]
+        output["export"] = schedule_export.start_export(project["schedule_export"], ism, key, calendar, export_units, skipped, previous_key)
+    return output
+
+
+# This code reads the .mgt header of a .mgt file to schedule. For archives, the contents (bytes) of the .mgt file are kept to write the scheduled .mgt file. header["state"] is the state of the HRU
+# carried over from the previous tail run (see tail.py), empty otherwise.
+def read_schedule(output, mgt_file):
+    if output["tail"]["previous"] is not None:
+        return tail.read_schedule(output["tail"], mgt_file)
+    if output["archive"] is None:
+        header = swat_files.read_schedule(mgt_file)
+    else:
+        with open(mgt_file, "rb") as file:
+            data = file.read()
+        header = swat_files.parse_schedule(data)
+        header["data"] = data
+    header["state"] = {}
+    return header
+
+
+# This code writes the schedule of a .mgt file. schedule is None if the HRU is not scheduled: loose .mgt files are left as copied, and archives get the unchanged .mgt file.
+# In tail mode, the file position of the end of the written schedule is recorded for the next tail run.
+def write_schedule(output, mgt_file, header, schedule):
+    if output["archive"] is None:
+        if schedule:
+            position = swat_files.write_schedule(mgt_file, header["position"], schedule, header["newline"])
+            if output["tail"]["enabled"]:
+                tail.record_position(output["tail"], mgt_file, position)
+        return
+    data = header["data"] if schedule is None else swat_files.insert_schedule(header["data"], header["position"], schedule, header["newline"])
+    scenario_archive.add_mgt(output["archive"], mgt_file, data, header, schedule is not None)
+
+
+# This code adds the scheduled operation lines of a .mgt file to the schedule export, if the project sets one.
+def add_rows(output, mgt_file, header, rows):
+    if output["export"] is not None:
+        schedule_export.add_rows(output["export"], mgt_file, header, rows)
+
+
+# This code records the state of a scheduled HRU at the end of the run for the next tail run (see tail.py).
+def record_state(output, mgt_file, header, state):
+    if output["tail"]["enabled"]:
+        tail.record_hru(output["tail"], mgt_file, header, output["unit_of"][os.path.basename(mgt_file)], state)
+
+
+# This code records that a .mgt file has been written (see checkpoint.py). Archives and tail runs extending a previous tail run are not checkpointed.
+# The schedule export of a unit is written before the unit is recorded as finished.
+def file_done(output, mgt_file):
+    if output["export"] is not None:
+        schedule_export.file_done(output["export"], mgt_file)
+    if output["progress"] is not None:
+        checkpoint.file_done(output["progress"], mgt_file)
+
+
+# This code completes the output of an ISM run.
+def finish_output(output):
+    if output["archive"] is not None:
+        scenario_archive.close_archive(output["archive"])
+        print(f"scenario archive written: {output['archive']['path']}")
+    tail.finish_tail(output["tail"], output["key"])
@@ -0,0 +1,203 @@
+"""
+ISM run planner
+
+This code estimates the runtime, peak memory and output size of an ISM run before launching it. Only cheap scans are made: the header line of every .mgt file (see mgt_catalog.py),
+the size and row count of output.hru (counted without parsing it), and the number of extra management operations per crop. No irrigation schedule is computed and pandas is not imported.
+
+The plan reports:
+1. HRUs per crop in the SWAT project, and which of them are scheduled by the ISMs
+2. Expected number of scheduled management operation lines per ISM. AUTOIRR writes one set of lines per growing season, DRIPIRR and CON-S write lines on every day of the growing season,
+   and EB-SWC writes at most one set of lines per irrigation interval of the growing season.
+3. Projected peak memory per ISM, which is dominated by reading output.hru into a dataframe
+4. Runtime estimate per ISM, from the throughput constants in ISM_COSTS and the cost of reading output.hru in READ_COSTS
+
+The throughput constants were calibrated from benchmark runs of the ISMs. Runtimes scale with machine speed, so users should time a small run on their own machine and adjust ISM_COSTS.
+
+Usage:
+python -m isms AUTOIRR DRIPIRR CON-S EB-SWC --plan --directory [.mgt directory] --output-hru [output.hru] --start YYYY-MM-DD --end YYYY-MM-DD --spinup-year YYYY --calibration-year YYYY
+
+DEFS:
+hru-day: one day of the simulation period for one HRU
+query: one pandas query on a dataframe (output.hru, or the extra operations of a crop)
+"""
+
+import csv
+import importlib
+import math
+import os
+
+from . import ISMS, crop_calendar, mgt_catalog
+from .project import load_project
+from .swat_files import OUTPUT_HRU_SKIPROWS
+
+LINE_BYTES = 92 #width of a scheduled management operation line written by generate_string, without the line ending of the .mgt file
+DELIM_BYTES = 18 #width of an end of year flag written by generate_year_delim, without the line ending of the .mgt file
+
+# Throughput constants (seconds) calibrated from benchmark runs of the ISMs:
+# day: loop overhead per hru-day
+# render day: cost per day of rendering the blocks shared across HRUs (see schedule_blocks.py), once per crop and year
+# line: cost of writing one scheduled management operation line
+# queries per season day: output.hru queries per hru-day of the growing season after the calibration start year
+# queries per calibration day: small-table queries per hru-day after the calibration start year
+# columns: number of output.hru columns read (None = all columns, 0 = output.hru is not read)
+# daily columns: number of output.hru columns arranged as daily arrays per HRU (see swat_files.daily_values)
+ISM_COSTS = {
+    "AUTOIRR": {"day": 0.0, "render day": 0.00001, "line": 0.00002, "queries per season day": 0, "queries per calibration day": 0, "columns": 0, "daily columns": 0},
+    "DRIPIRR": {"day": 0.00002, "render day": 0.00001, "line": 0.00002, "queries per season day": 2, "queries per calibration day": 0, "columns": None, "daily columns": 0},
+    "CON-S": {"day": 0.00002, "render day": 0.00001, "line": 0.00002, "queries per season day": 0, "queries per calibration day": 0, "columns": None, "daily columns": 0},
+    "EB-SWC": {"day": 0.000001, "render day": 0.00001, "line": 0.00002, "queries per season day": 0, "queries per calibration day": 0, "columns": 15, "daily columns": 1},
+}
+
+# Cost (seconds) of one query on a dataframe: fixed cost, cost per column and cost per value (row x column) of the dataframe
+QUERY_COSTS = {"query": 0.0025, "column": 0.0001, "value": 4e-9}
+
+# Cost (seconds) of reading output.hru into a dataframe (see swat_files.read_output_hru): cost per byte of output.hru, as every row is split into fields, and cost per value
+# (row x column) read
+READ_COSTS = {"byte": 1.2e-8, "value": 2e-8}
+
+BYTES_PER_VALUE = 8 #numeric output.hru columns are read as 64-bit values
+BYTES_PER_LULC = 60 #LULC column is read as python strings
+PARSER_OVERHEAD = 2.0 #peak memory of pandas.read_csv relative to the resulting dataframe
+
+
+# This code counts the data rows and columns of output.hru without parsing it. The file is read in binary chunks and line breaks are counted.
+def scan_output_hru(output_hru, skiprows=OUTPUT_HRU_SKIPROWS, chunk_size=1 << 20):
+    size = os.path.getsize(output_hru)
+    with open(output_hru, "rb") as file:
+        for _ in range(skiprows):
+            file.readline()
+        first_row = file.readline()
+        columns = len(first_row.split())
+        rows = first_row.count(b"\n")
+        last_chunk = first_row
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            rows += chunk.count(b"\n")
+            last_chunk = chunk
+        if last_chunk and not last_chunk.endswith(b"\n"):
+            rows += 1 #last row without a line break
+    return {"path": output_hru, "bytes": size, "rows": rows, "columns": columns}
+
+
+# This code counts the extra management operations of a crop that fall within the simulation period.
+def count_extra_ops(extra_ops_file, years):
+    if not os.path.isfile(extra_ops_file):
+        return 0
+    with open(extra_ops_file, "r", encoding="utf-8-sig", newline="") as file:
+        return sum(1 for row in csv.DictReader(file) if row["Year"] and int(row["Year"]) in years)
+
+
+# This code builds the run plan of one ISM from the .mgt header catalog, the output.hru scan and the crop calendar.
+def plan_ism(ism, project, catalog, scan):
+    engine = importlib.import_module("." + ISMS[ism], __package__) #engine modules import pandas only when run
+    project = load_project(project, engine.crops)
+    crops = project["crops"]
+    calibration_year = project["calibration_year"]
+    calendar = crop_calendar.build_calendar(crop_calendar.date_range(project["start"], project["end"]), crops, project["spinup_year"], calibration_year)
+    costs = ISM_COSTS[ism]
+
+    lines = 0
+    line_bytes = 0
+    scheduled_hrus = 0
+    season_days = 0
+    render_days = 0
+    for crop_key, crop in crops.items():
+        season = calendar["crops"][crop_key]
+        entries = [entry for entry in catalog if entry["crop"] == crop_key]
+        hrus = len(entries)
+        newline_bytes = sum(len(entry["newline"]) for entry in entries) #the scheduled lines are written with the line ending of each .mgt file
+        crop_season_days = int((season["in_season"] & calendar["calibration"]).sum())
+        extra_ops = count_extra_ops(project["extra_ops"].get(crop_key, ""), calendar["years"])
+        if ism == "AUTOIRR":
+            irr_lines = 2 * int((season["season_start"] & calendar["calibration"]).sum())
+            crop_delims = int(calendar["new_year"].sum())
+            render_days += len(calendar["dates"]) if hrus else 0
+        elif ism == "EB-SWC":
+            irr_lines = 2 * sum(math.ceil((stop - start) / crop["interval"]) for year, start, stop in season["seasons"] if year >= calibration_year and stop > start) #upper bound: every interval of the season is irrigated
+            crop_delims = int(calendar["year_end"].sum())
+            render_days += len(calendar["dates"]) if hrus else 0
+        else:
+            irr_lines = 2 * crop_season_days #upper bound: every day of the season is irrigated
+            crop_delims = int(calendar["year_end"].sum())
+            render_days += len(calendar["dates"]) if hrus else 0
+        lines += hrus * (irr_lines + extra_ops)
+        line_bytes += hrus * ((irr_lines + extra_ops) * LINE_BYTES + crop_delims * DELIM_BYTES) + newline_bytes * (irr_lines + extra_ops + crop_delims)
+        scheduled_hrus += hrus
+        season_days += hrus * crop_season_days
+
+    columns = scan["columns"] if costs["columns"] is None else costs["columns"]
+    memory = scan["rows"] * ((columns - 1) * BYTES_PER_VALUE + BYTES_PER_LULC) * PARSER_OVERHEAD if columns else 0
+    memory += scan["rows"] * costs["daily columns"] * BYTES_PER_VALUE
+    query_seconds = QUERY_COSTS["query"] + columns * QUERY_COSTS["column"] + scan["rows"] * columns * QUERY_COSTS["value"]
+    read_seconds = scan["bytes"] * READ_COSTS["byte"] + scan["rows"] * columns * READ_COSTS["value"] if columns else 0
+    runtime = (read_seconds
+               + scheduled_hrus * len(calendar["dates"]) * costs["day"]
+               + render_days * costs["render day"]
+               + season_days * costs["queries per season day"] * query_seconds
+               + scheduled_hrus * int(calendar["calibration"].sum()) * costs["queries per calibration day"] * QUERY_COSTS["query"]
+               + lines * costs["line"])
+    mgt_bytes = sum(entry["bytes"] for entry in catalog)
+    return {
+        "crops": sorted(crops),
+        "scheduled hrus": scheduled_hrus,
+        "days": len(calendar["dates"]),
+        "calibration days": int(calendar["calibration"].sum()),
+        "lines": lines,
+        "output bytes": mgt_bytes + line_bytes,
+        "peak memory bytes": int(memory),
+        "runtime seconds": runtime,
+    }
+
+
+# This code builds the run plan of each ISM on a SWAT project (see project.py for the project settings).
+def plan_run(project, isms=list(ISMS)):
+    directory = project["directory"]
+    catalog = mgt_catalog.build_catalog(directory)
+    for entry in catalog:
+        entry["bytes"] = os.path.getsize(os.path.join(directory, entry["file"]))
+    output_hru = project.get("output_hru") or "output.hru"
+    scan = scan_output_hru(output_hru) if os.path.isfile(output_hru) else {"path": output_hru, "bytes": 0, "rows": 0, "columns": 0}
+
+    return {
+        "mgt files": len(catalog),
+        "mgt bytes": sum(entry["bytes"] for entry in catalog),
+        "hrus per crop": mgt_catalog.hrus_per_crop(catalog),
+        "output.hru": scan,
+        "isms": {ism: plan_ism(ism, project, catalog, scan) for ism in isms},
+    }
+
+
+# This code formats byte counts and durations for the plan report.
+def format_bytes(n):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def format_seconds(seconds):
+    hours, rest = divmod(int(round(seconds)), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h {minutes:02d}m {seconds:02d}s"
+
+
+# This code prints the plan report.
+def print_plan(plan):
+    scan = plan["output.hru"]
+    print(f".mgt files: {plan['mgt files']} ({format_bytes(plan['mgt bytes'])})")
+    print(f"output.hru: {scan['rows']} rows x {scan['columns']} columns ({format_bytes(scan['bytes'])})")
+    for ism_plan in list(plan["isms"].values())[:1]:
+        print(f"simulation days: {ism_plan['days']} ({ism_plan['calibration days']} after calibration start)")
+    scheduled_crops = {crop_key for ism_plan in plan["isms"].values() for crop_key in ism_plan["crops"]}
+    print("HRUs per crop:")
+    for crop_key, count in sorted(plan["hrus per crop"].items(), key=lambda item: str(item[0])):
+        scheduled = "scheduled" if crop_key in scheduled_crops else "not scheduled"
+        print(f"  {str(crop_key):<6}{count:>8}  {scheduled}")
+    print(f"{'ISM':<10}{'lines':>12}{'output':>14}{'peak memory':>14}{'runtime':>14}")
+    for ism, ism_plan in plan["isms"].items():
+        print(f"{ism:<10}{ism_plan['lines']:>12}{format_bytes(ism_plan['output bytes']):>14}{format_bytes(ism_plan['peak memory bytes']):>14}{format_seconds(ism_plan['runtime seconds']):>14}")
+
+
@@ -0,0 +1,63 @@
+"""
+SWAT project settings
+
+This code defines the settings of an ISM run on one SWAT project. A project is a dictionary; it can be written directly in python (see the ISM scripts in the Python folder)
+or read from a JSON file (see the --project option of the command line interface).
+
+Settings:
+directory: directory of the SWAT .mgt files. The .mgt files with the ISM schedule are written to its "tmp" subfolder.
+output_hru: path to the SWAT output.hru file
+sol_directory: directory of the SWAT .sol files (EB-SWC only)
+start, end: SWAT project start and end dates (YYYY-MM-DD)
+spinup_year: SWAT spin-up start year
+calibration_year: SWAT calibration start year
+crops: crops and associated parameters. Defaults to the crops defined in the ISM module; crops given here replace them.
+extra_ops: csv of scheduled management operations other than irrigation, per crop
+resume: resume a crashed run with the same settings and input files, skipping units (subbasins) already finished (see checkpoint.py)
+batch_size: number of .mgt files per checkpoint unit. Defaults to one unit per subbasin.
+archive: path of a scenario archive (.zip). If set, the .mgt files with the ISM schedule are written to the archive instead of the tmp subfolder (see scenario_archive.py).
+archive_compression: compression of the scenario archive members: "stored" (uncompressed), "deflated" or "zstd" (python 3.14 or later)
+schedule_export: directory of a columnar Parquet dataset. If set, the full schedule of every ISM run is also written to it, partitioned by ISM and year (see schedule_export.py).
+io_workers: number of .mgt/.sol files read or written at the same time (see file_io.py). Set to 1 to read and write files one after another.
+tail: incremental tail mode. A run with a later end date than the previous tail run only schedules the days after the previous end date (see tail.py).
+"""
+
+import copy
+import json
+
+DEFAULTS = {
+    "output_hru": "output.hru",
+    "sol_directory": None,
+    "crops": None,
+    "extra_ops": {
+        "CORN": "corn.csv",
+        "SOYB": "SOYB.csv",
+        "TOBC": "TOBC.csv"
+    },
+    "resume": True,
+    "batch_size": None,
+    "archive": None,
+    "archive_compression": "stored",
+    "schedule_export": None,
+    "io_workers": 16,
+    "tail": False,
+}
+
+REQUIRED = ["directory", "start", "end", "spinup_year", "calibration_year"]
+
+
+# This code fills in the default settings of a project and checks that the required settings are given.
+def load_project(project, default_crops=None):
+    missing = [key for key in REQUIRED if project.get(key) is None]
+    if missing:
+        raise ValueError(f"project settings missing: {', '.join(missing)}")
+    settings = copy.deepcopy(DEFAULTS)
+    settings.update({key: value for key, value in project.items() if value is not None})
+    settings["crops"] = copy.deepcopy(settings["crops"] or default_crops) #the ISMs update the crop parameters while running, so the user's crops are not modified
+    return settings
+
+
+# This code reads project settings from a JSON file.
+def read_project_file(path):
+    with open(path, "r") as file:
+        return json.load(file)
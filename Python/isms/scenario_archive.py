@@ -0,0 +1,102 @@
+"""
+Scenario archives
+
+By default, an ISM run writes a full copy of the SWAT project's .mgt files to the tmp folder. When many scenarios (ISMs, crop parameters, sweep points) are generated,
+this means hundreds of thousands of small files, which are slow to copy and use up inodes. Instead, a run can stream the scheduled .mgt files of a scenario into a
+single archive (see the "archive" project setting in project.py), and only the scenarios that are actually run in SWAT are extracted into a SWAT project folder.
+
+A scenario archive is a zip file with one member per .mgt file, stored under the .mgt file name, and a member index (index.json) holding the run key (see checkpoint.py)
+and, for every member, the watershed HRU number, subbasin and land use of the HRU, its size, its SHA-256 checksum, and whether an ISM schedule was written to it.
+Members are uncompressed by default ("stored"); "deflated" and, with python 3.14 or later, "zstd" compression can also be used.
+
+The archive is written to [archive].partial and renamed when the run is complete, so a finished archive is never left half written. Archive runs are not checkpointed:
+a crashed run is started over.
+
+Extracting writes every member into the SWAT project folder (TxtInOut) through a temporary file that is renamed into place, so SWAT never reads a half written .mgt file.
+Members whose file in the SWAT project folder already matches the checksum in the index (ex., HRUs of crops that are not scheduled) are skipped.
+
+Usage (from the Python folder):
+python -m isms EB-SWC --project project.json --archive scenarios/EB-SWC.zip
+python -m isms --extract scenarios/EB-SWC.zip --into [SWAT project TxtInOut folder]
+"""
+
+import hashlib
+import json
+import os
+import threading
+import zipfile
+
+from . import checkpoint, file_io
+
+INDEX = "index.json"
+COMPRESSION = {
+    "stored": zipfile.ZIP_STORED,
+    "deflated": zipfile.ZIP_DEFLATED,
+    "zstd": getattr(zipfile, "ZIP_ZSTANDARD", None), #python 3.14 or later
+}
+
+
+# This code opens a new scenario archive for writing.
+def open_archive(path, key, compression="stored"):
+    if COMPRESSION.get(compression) is None:
+        raise ValueError(f"archive compression not available: {compression}")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    partial = path + ".partial"
+    return {
+        "path": path,
+        "partial": partial,
+        "zip": zipfile.ZipFile(partial, "w", COMPRESSION[compression]),
+        "lock": threading.Lock(), #members are added by the background writer threads (see file_io.py)
+        "index": {"run": key, "members": {}},
+    }
+
+
+# This code adds a .mgt file to the archive. data is the contents (bytes) of the scheduled .mgt file, spliced as the loose .mgt files are written (see swat_files.insert_schedule),
+# so archive members are byte-identical to the loose .mgt files. entry is the .mgt header (see swat_files.parse_schedule).
+def add_mgt(archive, mgt_file, data, entry, scheduled):
+    name = os.path.basename(mgt_file)
+    with archive["lock"]:
+        archive["zip"].writestr(name, data)
+        archive["index"]["members"][name] = {
+            "hruno": entry["hruno"],
+            "subbasin": entry["subbasin"],
+            "crop": entry["crop"],
+            "bytes": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "scheduled": scheduled,
+        }
+
+
+# This code writes the member index, closes the archive and renames it into place.
+def close_archive(archive):
+    with archive["lock"]:
+        archive["zip"].writestr(INDEX, json.dumps(archive["index"], indent=1, sort_keys=True))
+        archive["zip"].close()
+    os.replace(archive["partial"], archive["path"])
+
+
+# This code reads the member index of a scenario archive.
+def read_index(path):
+    with zipfile.ZipFile(path, "r") as archive:
+        return json.loads(archive.read(INDEX))
+
+
+# This code extracts the .mgt files of a scenario archive into a SWAT project folder. Members are written by up to workers threads at the same time (see file_io.py).
+def extract_archive(path, swat_directory, workers=file_io.WORKERS, skip_unchanged=True):
+    with zipfile.ZipFile(path, "r") as archive:
+        members = json.loads(archive.read(INDEX))["members"]
+
+        def extract(name):
+            target = os.path.join(swat_directory, name)
+            member = members[name]
+            if skip_unchanged and os.path.isfile(target) and os.path.getsize(target) == member["bytes"] and checkpoint.file_checksum(target) == member["sha256"]:
+                return False
+            with open(target + ".tmp", "wb") as file:
+                file.write(archive.read(name))
+            os.replace(target + ".tmp", target)
+            return True
+
+        written = file_io.map_files(extract, sorted(members), workers)
+    return {"members": len(written), "written": sum(written)}
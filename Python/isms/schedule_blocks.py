@@ -0,0 +1,41 @@
+"""
+Schedule block cache
+
+This code caches pre-rendered blocks of scheduled management operation lines that are identical across HRUs. The extra management operations of a crop (from the user-created csvs)
+are the same for every HRU of the crop, and the AUTOIRR schedule of a year only differs between HRUs of a crop by the subbasin field. These blocks are rendered once,
+and the ISMs stitch them together with the HRU-specific irrigation lines instead of formatting every line again for every HRU.
+
+Blocks are keyed by (crop, year, subbasin); blocks that do not depend on the subbasin use subbasin = None. When the cache holds more than max_blocks blocks,
+the least recently used block is evicted.
+
+Usage in the ISMs:
+cache = schedule_blocks.new_cache()
+block = schedule_blocks.get_block(cache, (crop_key, year, subbasin), lambda: render(crop_key, year, subbasin))
+"""
+
+from collections import OrderedDict
+
+
+def new_cache(max_blocks=4096):
+    return {"blocks": OrderedDict(), "max_blocks": max_blocks, "hits": 0, "misses": 0, "evictions": 0}
+
+
+# This code returns the block stored under key, rendering it with render() if it is not cached yet.
+def get_block(cache, key, render):
+    blocks = cache["blocks"]
+    if key in blocks:
+        blocks.move_to_end(key) #marks the block as most recently used
+        cache["hits"] += 1
+        return blocks[key]
+
+    block = render()
+    cache["misses"] += 1
+    blocks[key] = block
+    while len(blocks) > cache["max_blocks"]:
+        blocks.popitem(last=False) #evicts the least recently used block
+        cache["evictions"] += 1
+    return block
+
+
+def cache_stats(cache):
+    return f"schedule block cache: {len(cache['blocks'])} blocks, {cache['hits']} hits, {cache['misses']} misses, {cache['evictions']} evictions"
@@ -0,0 +1,151 @@
+"""
+Columnar schedule export
+
+The scheduled management operations of an ISM run are written into the .mgt files as fixed-width text, which is slow to parse back for analysis (ex., comparing the irrigation
+applied by the ISMs across HRUs, crops and years). If the project sets a schedule_export directory (see project.py), every ISM run also writes its full schedule, irrigation
+and extra management operations, as one columnar Parquet dataset, alongside the .mgt files or scenario archive.
+
+The dataset is partitioned by ISM and year (hive partitioning: [schedule_export]/ism=EB-SWC/year=2008/...), so a query on one ISM or year only reads the files of that
+partition, and every file holds one row per scheduled operation line with typed columns:
+hru: watershed HRU number (int32)
+subbasin: subbasin number (int32)
+crop: land use of the HRU (string)
+date: date of the operation (date32)
+op: management operation code, MGT_OP (int16), ex., 2 for irrigation, 10 for auto-irrigation
+irr_sc: irrigation source code, IRR_SC (int8), null if not given
+amount: irrigation depth (mm) of irrigation operations; for other operations, the value in the same column of the operation line (ex., FRT_KG of fertilizer applications)
+efficiency: irrigation efficiency, IRR_EFM (float64), null if not given
+mgt_file: name of the .mgt file
+
+The rows of every checkpoint unit (see checkpoint.py) are written to one file per year ([unit].parquet) once all .mgt files of the unit are written, before the unit is recorded
+as finished, so a resumed run keeps the files of the units it skips. A tail run extending the previous tail run (see tail.py) adds the rows of the new days in new files
+([unit].[first new day].parquet). The export requires pyarrow.
+
+Usage (from the Python folder):
+python -m isms EB-SWC --project project.json --schedule-export schedules
+pyarrow.dataset.dataset("schedules", partitioning="hive").to_table(filter=(pc.field("ism") == "EB-SWC") & (pc.field("year") == 2008) & (pc.field("op") == 2))
+"""
+
+import json
+import os
+import shutil
+
+STATE = "_export.json" #files starting with "_" are ignored by Parquet dataset readers
+COLUMNS = ["hru", "subbasin", "crop", "day", "op", "irr_sc", "amount", "efficiency", "mgt_file"]
+
+
+# This code imports pyarrow, which is only needed for the schedule export.
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("the schedule export requires pyarrow (pip install pyarrow)") from None
+    return pyarrow, pyarrow.parquet
+
+
+# This code starts the schedule export of an ISM run. unit_of maps every .mgt file to its unit, and skipped lists the units finished by a previous run (see checkpoint.py).
+# The partition of the ISM is emptied unless it holds the export of a previous run with the same run key, or of the previous tail run (run key previous) the run extends (see tail.py).
+def start_export(path, ism, key, calendar, unit_of, skipped=(), previous=None):
+    import_pyarrow()
+    directory = os.path.join(path, f"ism={ism}")
+    state = None
+    if os.path.isfile(os.path.join(directory, STATE)):
+        with open(os.path.join(directory, STATE), "r") as file:
+            state = json.load(file)
+    if state is None or state.get("run") not in (key, previous):
+        shutil.rmtree(directory, ignore_errors=True)
+        state = {"run": key, "units": []}
+    os.makedirs(directory, exist_ok=True)
+    if state["run"] != key:
+        state["run"] = key
+        write_state(directory, state)
+
+    missing = sorted(set(skipped) - set(state["units"]))
+    if missing:
+        print(f"schedule export: {len(missing)} skipped units were not exported by the previous run, run with --no-resume for a complete export")
+
+    remaining = {}
+    for mgt_file, unit_id in unit_of.items():
+        if unit_id not in skipped:
+            remaining.setdefault(unit_id, set()).add(mgt_file)
+    return {
+        "directory": directory,
+        "state": state,
+        "calendar": calendar,
+        "unit_of": unit_of,
+        "remaining": remaining,
+        "rows": {},
+    }
+
+
+# This code adds the scheduled operation lines of a .mgt file. rows are (day index, op, irr_sc, amount, efficiency) tuples; header is the .mgt header (see swat_files.parse_schedule).
+def add_rows(export, mgt_file, header, rows):
+    mgt_file = os.path.basename(mgt_file)
+    columns = export["rows"].setdefault(export["unit_of"][mgt_file], {name: [] for name in COLUMNS})
+    for i, op, irr_sc, amount, efficiency in rows:
+        columns["hru"].append(header["hruno"])
+        columns["subbasin"].append(header["subbasin"])
+        columns["crop"].append(header["crop"])
+        columns["day"].append(i)
+        columns["op"].append(op)
+        columns["irr_sc"].append(irr_sc)
+        columns["amount"].append(amount)
+        columns["efficiency"].append(efficiency)
+        columns["mgt_file"].append(mgt_file)
+
+
+# This code converts a value of an operation line to a number. Values left blank in the operation line ("" or None) are null.
+def to_number(value, kind=float):
+    if value is None or value == "":
+        return None
+    return kind(float(value))
+
+
+# This code records that a .mgt file has been written. When it is the last .mgt file of its unit, the rows of the unit are written.
+def file_done(export, mgt_file):
+    mgt_file = os.path.basename(mgt_file)
+    unit_id = export["unit_of"][mgt_file]
+    remaining = export["remaining"][unit_id]
+    remaining.discard(mgt_file)
+    if not remaining:
+        write_unit(export, unit_id)
+
+
+# This code writes the rows of a unit, one Parquet file per year, and records the unit as exported.
+def write_unit(export, unit_id):
+    import numpy as np
+
+    pa, pq = import_pyarrow()
+    columns = export["rows"].pop(unit_id, None)
+    if columns is not None:
+        calendar = export["calendar"]
+        days = np.asarray(columns["day"], dtype=int)
+        years = calendar["year"][days]
+        table = pa.table({
+            "hru": pa.array(columns["hru"], pa.int32()),
+            "subbasin": pa.array(columns["subbasin"], pa.int32()),
+            "crop": pa.array(columns["crop"], pa.string()),
+            "date": pa.array(calendar["dates"][days], pa.date32()),
+            "op": pa.array([to_number(op, int) for op in columns["op"]], pa.int16()),
+            "irr_sc": pa.array([to_number(irr_sc, int) for irr_sc in columns["irr_sc"]], pa.int8()),
+            "amount": pa.array([to_number(amount) for amount in columns["amount"]], pa.float64()),
+            "efficiency": pa.array([to_number(efficiency) for efficiency in columns["efficiency"]], pa.float64()),
+            "mgt_file": pa.array(columns["mgt_file"], pa.string()),
+        })
+        for year in np.unique(years):
+            year_directory = os.path.join(export["directory"], f"year={year}")
+            os.makedirs(year_directory, exist_ok=True)
+            part = os.path.join(year_directory, f"{unit_id}.parquet")
+            pq.write_table(table.filter(pa.array(years == year)), part + ".tmp")
+            os.replace(part + ".tmp", part)
+
+    export["state"]["units"] = sorted(set(export["state"]["units"]) | {unit_id})
+    write_state(export["directory"], export["state"])
+
+
+# This code writes the run key and the exported units of the partition of the ISM.
+def write_state(directory, state):
+    with open(os.path.join(directory, STATE + ".tmp"), "w") as file:
+        json.dump(state, file, indent=1)
+    os.replace(os.path.join(directory, STATE + ".tmp"), os.path.join(directory, STATE))
@@ -0,0 +1,247 @@
+"""
+SWAT input/output files
+
+This code reads and writes the SWAT files shared by the ISMs: output.hru, the .sol soil input files, the user-created csvs of extra management operations per crop,
+and the scheduled management operation lines of the .mgt files. Refer to the SWAT 2012 input/output documentation for definitions of the variables below.
+
+pandas is imported when output.hru or the extra management operations are read, so importing this module is cheap.
+"""
+
+import os
+import re
+
+# output.hru column headers. SWAT does not output delimited headers, so the header rows are skipped and the columns are reassigned.
+OUTPUT_HRU_COLUMNS = ["LULC","HRU","GIS","SUB","MGT","MON","DAY","YEAR", "AREAkm2","PRECIPmm","SNOFALLmm","SNOMELTmm","IRRmm","PETmm","ETmm","SW_INITmm","SW_ENDmm",
+                      "PERCmm","GW_RCHGmm","DA_RCHGmm","REVAPmm","SA_IRRmm","DA_IRRmm","SA_STmm","DA_STmm","SURQ_GENmm","SURQ_CNTmm","TLOSSmm","LATQGENmm",
+                      "GW_Qmm","WYLDmm","DAILYCN","TMP_AVdgC","TMP_MXdgC","TMP_MNdgC","SOL_TMPdgC","SOLARMJ/m2","SYLDt/ha","USLEt/ha","N_APPkg/ha","P_APPkg/ha",
+                      "NAUTOkg/ha","PAUTOkg/ha","NGRZkg/ha","PGRZkg/ha","NCFRTkg/ha","PCFRTkg/ha","NRAINkg/ha","NFIXkg/ha","F-MNkg/ha","A-MNkg/ha","A-SNkg/ha",
+                      "F-MPkg/ha","AO-LPkg/ha","L-APkg/ha","A-SPkg/ha","DNITkg/ha","NUPkg/ha","PUPkg/ha","ORGNkg/ha","ORGPkg/ha","SEDPkg/ha","NSURQkg/ha",
+                      "NLATQkg/ha","NO3Lkg/ha","NO3GWkg/ha","SOLPkg/ha","P_GWkg/ha","W_STRS","TMP_STRS","N_STRS","P_STRS","BIOMt/ha","LAI","YLDt/ha",
+                      "BACTPct","BACTLPct","WTABCLIm","WTABSOLm","SNOmm","CMUPkg/ha","CMTOTkg/ha","QTILEmm","TNO3kg/ha","LNO3kg/ha","GW_Q_Dmm","LATQCNTmm"]
+OUTPUT_HRU_DTYPES = {"LULC": object, "HRU": "int64", "GIS": "int64", "SUB": "int64", "MGT": "int64", "MON": "int64", "DAY": "int64", "YEAR": "int64"} #other columns are float
+OUTPUT_HRU_SKIPROWS = 9 #skip first 9 rows, including header row because it isn't delimited properly
+
+_extra_ops_tables = {} #parsed extra management operation csvs, by path, modification time and size
+
+
+# This code reads the SWAT project output.hru. usecols selects column positions to read; columns are the headers of the columns read.
+# With start and stop, only the rows between these byte offsets of output.hru are read (see tail.py).
+def read_output_hru(output_hru, usecols=None, columns=OUTPUT_HRU_COLUMNS, start=None, stop=None):
+    import io
+    import pandas as pd
+
+    if start is None:
+        hrus = pd.read_csv(output_hru, sep=r'\s+', usecols=usecols, skiprows=OUTPUT_HRU_SKIPROWS, header=None)
+    else:
+        with open(output_hru, "rb") as file:
+            file.seek(start)
+            data = file.read(stop - start)
+        if not data.strip():
+            return pd.DataFrame({column: pd.Series(dtype=OUTPUT_HRU_DTYPES.get(column, float)) for column in columns}) #no rows in the byte range
+        hrus = pd.read_csv(io.BytesIO(data), sep=r'\s+', usecols=usecols, header=None)
+    hrus.columns = columns
+    return hrus
+
+
+# This code returns the byte offset of output.hru just after the last complete row dated on or before end (year, month, day). output.hru rows are written in order of date,
+# so the offset is found by a binary search over the file instead of reading it.
+def output_hru_offset(output_hru, end):
+    with open(output_hru, "rb") as file:
+        for _ in range(OUTPUT_HRU_SKIPROWS):
+            file.readline()
+        data_start = file.tell()
+        size = file.seek(0, os.SEEK_END)
+
+        # This code returns the start of the first row starting at or after position, and whether that row is dated after end (or is not complete yet).
+        def row_after(position):
+            if position > data_start:
+                file.seek(position - 1)
+                file.readline()
+            else:
+                file.seek(data_start)
+            row_start = file.tell()
+            line = file.readline()
+            if not line.endswith(b"\n"):
+                return row_start, True
+            fields = line.split()
+            return row_start, (int(fields[7]), int(fields[5]), int(fields[6])) > tuple(end) #YEAR, MON, DAY
+
+        low, high = data_start, size
+        while low < high:
+            middle = (low + high) // 2
+            if row_after(middle)[1]:
+                high = middle
+            else:
+                low = middle + 1
+        return row_after(low)[0]
+
+
+# This code arranges one output.hru column as a table of daily values per HRU over the simulation calendar (see crop_calendar.py), so the ISMs index an HRU's daily values
+# by calendar day index instead of querying output.hru every day. Returns the row of every watershed HRU number and the table (HRUs x days, NaN where output.hru has no value).
+# If output.hru holds the same HRU and day more than once, the first value is kept, as a query would find it.
+def daily_values(hrus, dates, column):
+    import numpy as np
+
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    if not len(dates):
+        return {}, np.full((0, 0), np.nan) #no days (ex., a tail run with no new days, see tail.py)
+    months = ((hrus["YEAR"].to_numpy() - 1970) * 12 + hrus["MON"].to_numpy() - 1).astype("datetime64[M]")
+    day_index = (months.astype("datetime64[D]") + (hrus["DAY"].to_numpy() - 1) - dates[0]).astype(int)
+    hru_numbers, hru_rows = np.unique(hrus["HRU"].to_numpy(), return_inverse=True)
+    hru_rows = hru_rows.reshape(-1)
+
+    values = np.full((len(hru_numbers), len(dates)), np.nan)
+    valid = np.flatnonzero((day_index >= 0) & (day_index < len(dates)))
+    keys, first = np.unique(hru_rows[valid] * len(dates) + day_index[valid], return_index=True)
+    values.flat[keys] = hrus[column].to_numpy(dtype=float)[valid[first]]
+    return {int(hruno): row for row, hruno in enumerate(hru_numbers)}, values
+
+
+# This code reads the user-created csvs of scheduled management operations that are not irrigation (ex., fertilizer applications, tillage, pesticde applications...), one csv per crop.
+# Parsed csvs are kept for the life of the process, so ISM runs on projects that share csvs (ex., in a batch, see batch.py) parse them once. A csv modified since it was parsed is read again.
+def read_extra_ops(extra_ops_files):
+    import pandas as pd
+
+    extra_ops = {}
+    for crop_key, extra_ops_file in extra_ops_files.items():
+        stat = os.stat(extra_ops_file)
+        key = (os.path.realpath(extra_ops_file), stat.st_mtime_ns, stat.st_size)
+        if key not in _extra_ops_tables:
+            _extra_ops_tables[key] = pd.read_csv(extra_ops_file, keep_default_na=False)
+        extra_ops[crop_key] = _extra_ops_tables[key]
+    return extra_ops
+
+
+# This code reads the SOL_AWC of every soil layer of an HRU from its .sol file (10th line), and returns the average value across all soil layers.
+def read_sol_awc(sol_file):
+    from statistics import mean
+
+    with open(sol_file, "r") as file:
+        data = file.readlines() #reads file line by line
+    awc_line = data[9]
+    SOL_AWC = re.findall(r'\S+(?:[^\S\r\n]\S+)*', awc_line) #returns all data in line separated by space delim
+    del SOL_AWC[0:2] #Deletes line title so only values remain
+    SOL_AWC = list(map(float, SOL_AWC)) #converts string list into float list
+    return mean(SOL_AWC)
+
+
+# This code reads the .mgt header of a .mgt file opened in binary mode and moves the file position to the start of the scheduled management operation lines.
+def open_schedule(file):
+    header = parse_schedule(file.read())
+    file.seek(header["position"])
+    return header
+
+
+# This code finds the .mgt header and the position of the scheduled management operation lines in the contents (bytes) of a .mgt file. The position is a byte offset, the start of
+# the line after "Operation Schedule", and newline is the line ending of that line ("\r\n" in .mgt files written by ArcSWAT), which the scheduled operation lines are written with.
+# This is a change from the original ISM scripts, which wrote at 50 characters after the start of "Operation Schedule": the same position for the 49 character line with a "\n"
+# line ending, but inside the "\r\n" line ending of the .mgt files written by ArcSWAT.
+def parse_schedule(data):
+    data = data.decode("latin-1") #one character per byte, so positions in the text are byte offsets in the .mgt file
+    index = data.index("\n", data.index("Operation Schedule")) + 1
+    return {
+        "hru": int(re.search(r"(?<=HRU\:)\d+", data)[0]), #regex; looking for HRU: and digits after, in data file. This searches for HRU number in each mgt file. [0] means we just want the first result
+        "hruno": int(re.search(r"(?<=Watershed HRU\:)\d+", data)[0]),
+        "subbasin": int(re.search(r"(?<=Subbasin\:)\d+", data)[0]), #same as above but for subbasin
+        "crop": re.search(r"(?<=Luse\:)[A-Z]+", data)[0], #same as above but for luse
+        "position": index, #file position of the scheduled management operation lines
+        "newline": "\r\n" if data[index - 2:index] == "\r\n" else "\n",
+    }
+
+
+# This code reads the .mgt header of a .mgt file (see open_schedule). Used to prefetch .mgt files concurrently (see file_io.py).
+def read_schedule(mgt_file):
+    with open(mgt_file, "rb") as file:
+        return open_schedule(file)
+
+
+# This code encodes the scheduled management operation lines with the line ending of the .mgt file (see parse_schedule).
+def encode_schedule(schedule, newline="\n"):
+    return schedule.replace("\n", newline).encode("utf-8")
+
+
+# This code writes the scheduled management operation lines of a .mgt file, starting at the position returned by read_schedule, and returns the position of the end of the lines.
+def write_schedule(mgt_file, position, schedule, newline="\n"):
+    with open(mgt_file, "r+b") as file:
+        file.seek(position)
+        file.write(encode_schedule(schedule, newline))
+        return file.tell()
+
+
+# This code returns the contents (bytes) of a .mgt file with the scheduled management operation lines written at position, as write_schedule would leave the file.
+def insert_schedule(data, position, schedule, newline="\n"):
+    schedule = encode_schedule(schedule, newline)
+    return data[:position] + schedule + data[position + len(schedule):]
+
+
+# This code creates formatting for scheduled management operation lines input into the SWAT .mgt files (DRIPIRR, CON-S and EB-SWC).
+def generate_string(file, month, day, ops_no, irr_sc, sub, irr, irr_efm, fert_id="", fert_surf="", bio_init="", hi_targ="", bio_targ=""):
+    string = str(month).rjust(3)
+    string += str(day).rjust(3)
+    string += str(ops_no).rjust(12)
+    string += str(fert_id).rjust(5)
+    string += str(irr_sc).rjust(4)
+    string += str(format(float(irr), '.5f') if irr != '' else '').rjust(16)
+    string += str('{:.2f}'.format(float(fert_surf)) if fert_surf != '' else '').rjust(7)
+    string += str('{:.5f}'.format(float(irr_efm)) if irr_efm != '' else '').rjust(12)
+    string += str('{:.2f}'.format(float(bio_init)) if bio_init != '' else '').rjust(5)
+    string += str('{:.2f}'.format(float(hi_targ)) if hi_targ != '' else '').rjust(7)
+    string += str('{:.2f}'.format(float(bio_targ)) if bio_targ != '' else '').rjust(6)
+    string += str(sub).rjust(12)
+    file.write(string + '\n')
+
+
+# This code writes the management schedule of one year of an HRU (DRIPIRR, CON-S and EB-SWC), followed by the end of year flag: the pre-rendered scheduled operation lines for all
+# management operations other than irrigation (see render_extra_ops) and the irrigation operation lines, given as (day index, IRR_SC, irrigation amount, IRR_EFM), in order of day.
+# The operation lines are also added to rows (see schedule_export.py). With irrigation_first, the irrigation lines of a day come before its other operation lines.
+def write_year(file, calendar, subbasin, extra_block, irrigation, rows, irrigation_first=False):
+    irrigation_days = {}
+    for line in irrigation:
+        irrigation_days.setdefault(line[0], []).append(line)
+    for i in sorted(set(extra_block) | set(irrigation_days)):
+        text, extra_rows = extra_block.get(i, ("", ()))
+        if not irrigation_first:
+            file.write(text)
+            rows.extend(extra_rows)
+        for day, irr_sc, irr, irr_efm in irrigation_days.get(i, ()):
+            generate_string(file, calendar["month"][day], calendar["day"][day], 2, irr_sc, subbasin, irr, irr_efm, "", 0.00, 0.00, "", "")
+            rows.append((day, 2, irr_sc, irr, irr_efm))
+        if irrigation_first:
+            file.write(text)
+            rows.extend(extra_rows)
+    generate_year_delim(file)
+
+
+# This code defines a function that inputs scheduled management operation "17", end of year flag, into the correct scheduled management operation line position. This signifies the end of the growing season and tells SWAT to start a new year of scheduled management ops.
+def generate_year_delim(file):
+    return file.write("17".rjust(18) + "\n")
+
+
+# This code defines a function that returns a line break in the .mgt scheduled management operation lines.
+def insert_break(file):
+    return file.write("\n")
+
+
+# This code returns the path of the tmp directory where the .mgt files with the ISM schedule are written.
+def tmp_directory(directory):
+    return os.path.join(directory, "tmp")
+
+
+# This code renders the scheduled operation lines of all management operations other than irrigation for one crop and year, keyed by calendar day index (DRIPIRR, CON-S and EB-SWC),
+# with the same operation lines as rows of the schedule export (see schedule_export.py). The extra operations of the year are queried once, and the lines are the same for every HRU
+# of the crop, so they are rendered once per crop and year and shared through the schedule block cache (see schedule_blocks.py).
+def render_extra_ops(calendar, extra_ops, year):
+    import io
+
+    start, stop = calendar["years"][year]
+    day_index = {(calendar["month"][i], calendar["day"][i]): i for i in range(start, stop)}
+    extra_block = {}
+    for index, extra_op in extra_ops.query(f'Year == {year}').iterrows():
+        i = day_index.get((extra_op["Month"], extra_op["Day"]))
+        if i is None:
+            continue #operation date is outside of the simulation period
+        block = io.StringIO()
+        generate_string(block, calendar["month"][i], calendar["day"][i], extra_op["ops_no"], extra_op["irr_sc"], "", extra_op["irr"], extra_op["irr_efm"], extra_op["fert_id"], extra_op["fert_surf"], extra_op["bio_init"], extra_op["hi_targ"], extra_op["bio_targ"])
+        text, rows = extra_block.get(i, ("", []))
+        extra_block[i] = (text + block.getvalue(), rows + [(i, extra_op["ops_no"], extra_op["irr_sc"], extra_op["irr"], extra_op["irr_efm"])])
+    return extra_block
@@ -0,0 +1,174 @@
+"""
+Incremental tail runs
+
+For near-real-time runs, the SWAT simulation period is extended a few weeks at a time, and every extension would re-run the ISMs over the whole simulation period. In tail mode
+(see the "tail" project setting in project.py), an ISM run keeps the state of every HRU at the end of the simulation period (tail.json in the tmp directory), and the next
+tail run with a later end date only schedules the days after the previous end date:
+1. Only the output.hru rows appended after the previous end date are read, from the byte offset where the previous run stopped reading. The last bytes read by the previous run
+   are checked first; if output.hru was rewritten with different values, the whole simulation period is scheduled again.
+2. The state of every HRU is carried over: the irrigation lines of the current (open) year, which are only written to the .mgt file at the end of the year (DRIPIRR, EB-SWC),
+   day_count and irr_event_no (EB-SWC), and the actual evapotranspiration of the open year (CON-S, which spreads the crop water requirement of a whole year over its growing season,
+   so the open year is scheduled again from its start with the ET carried over).
+3. The operation lines of the new days are appended after the end of the schedule written by the previous run; the rest of the .mgt file is not read or rewritten.
+
+A tail run schedules the same operation lines as a full run over the extended simulation period. The first tail run (or a tail run with other settings) schedules the whole simulation
+period and is not resumed after a crash (see checkpoint.py); a crashed tail run extending a previous one is simply run again. A run outside tail mode discards the state of the previous tail run.
+Tail runs write to the tmp folder; they cannot write scenario archives.
+
+Usage (from the Python folder), every time the SWAT simulation period is extended:
+python -m isms EB-SWC --project project.json --end 2019-07-31 --tail
+"""
+
+import hashlib
+import json
+import os
+
+from . import checkpoint, swat_files
+
+STATE = "tail.json"
+SIGNATURE_BYTES = 4096 #bytes of output.hru before the offset checked by the next tail run
+
+
+# This code reads the state of the previous tail run from the tmp directory.
+def load_state(tmp_directory):
+    path = os.path.join(tmp_directory, STATE)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except ValueError:
+        return None #unreadable state, the whole simulation period is scheduled again
+
+
+# This code deletes the state of the previous tail run. A run that does not extend it rewrites the .mgt files of the tmp folder, so the positions in the state are no longer valid.
+def discard_state(tmp_directory):
+    path = os.path.join(tmp_directory, STATE)
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+# This code returns the SHA-256 checksum of the bytes of output.hru before offset.
+def output_hru_signature(output_hru, offset):
+    with open(output_hru, "rb") as file:
+        file.seek(max(offset - SIGNATURE_BYTES, 0))
+        return hashlib.sha256(file.read(min(offset, SIGNATURE_BYTES))).hexdigest()
+
+
+# This code starts an ISM run in tail mode. If the previous tail run can be extended, first is the day index of the first day after its end date; otherwise the whole
+# simulation period is scheduled (first = 0). year_first is the day index of the start of the year of the first day. Without tail mode, the run schedules the whole simulation period.
+# inputs is the fingerprint of the input files other than output.hru (see checkpoint.input_fingerprint), which is checked separately as it grows.
+def start_tail(project, ism, calendar, crop_table, inputs):
+    import numpy as np
+
+    dates = calendar["dates"]
+    tail_run = {
+        "enabled": bool(project["tail"]),
+        "ism": ism,
+        "settings": checkpoint.run_key(ism, dates[0], project["spinup_year"], project["calibration_year"], crop_table, inputs), #run settings other than the end date
+        "end": str(dates[-1]),
+        "first": 0,
+        "year_first": 0,
+        "previous": None,
+        "carried": {}, #ISM state carried over from the previous tail run
+        "state": {}, #ISM state at the end of this run
+        "hrus": {}, #state of every scheduled HRU at the end of this run
+        "output_hru": None,
+    }
+    if not tail_run["enabled"]:
+        if project["archive"] is None:
+            discard_state(swat_files.tmp_directory(project["directory"]))
+        return tail_run
+    if project["archive"] is not None:
+        raise ValueError("tail mode extends the .mgt files of the tmp folder and cannot write a scenario archive")
+
+    tail_run["tmp_directory"] = swat_files.tmp_directory(project["directory"])
+    previous = load_state(tail_run["tmp_directory"])
+    if previous is None:
+        reason = "no previous tail run"
+    elif previous["ism"] != ism or previous["settings"] != tail_run["settings"]:
+        reason = "the previous tail run has other settings"
+    elif previous["end"] > tail_run["end"]:
+        reason = f"the previous tail run ends after {tail_run['end']}"
+    elif previous["output_hru"] is not None and (os.path.getsize(project["output_hru"]) < previous["output_hru"]["offset"]
+                                                 or output_hru_signature(project["output_hru"], previous["output_hru"]["offset"]) != previous["output_hru"]["signature"]):
+        reason = "output.hru has changed before the end of the previous tail run"
+    else:
+        reason = None
+    if reason:
+        print(f"tail: {reason}, scheduling the whole simulation period")
+        discard_state(tail_run["tmp_directory"])
+        return tail_run
+
+    first = int(np.searchsorted(dates, np.datetime64(previous["end"]), side="right"))
+    tail_run["first"] = first
+    tail_run["year_first"] = calendar["years"][int(calendar["year"][first])][0] if first < len(dates) else first
+    tail_run["previous"] = previous
+    tail_run["carried"] = previous["state"]
+    print(f"tail: extending the schedule from {previous['end']} to {tail_run['end']}")
+    return tail_run
+
+
+# This code reads output.hru (see swat_files.read_output_hru). In tail mode, it records the byte offset after the last row on or before the end date, and when extending
+# a previous tail run, only the rows after the offset of the previous run are read.
+def read_output_hru(project, tail_run, usecols=None, columns=swat_files.OUTPUT_HRU_COLUMNS):
+    output_hru = project["output_hru"]
+    if not tail_run["enabled"]:
+        return swat_files.read_output_hru(output_hru, usecols, columns)
+
+    year, month, day = (int(value) for value in tail_run["end"].split("-"))
+    offset = swat_files.output_hru_offset(output_hru, (year, month, day))
+    tail_run["output_hru"] = {"offset": offset, "signature": output_hru_signature(output_hru, offset)}
+    if tail_run["previous"] is None:
+        return swat_files.read_output_hru(output_hru, usecols, columns)
+    return swat_files.read_output_hru(output_hru, usecols, columns, start=tail_run["previous"]["output_hru"]["offset"], stop=offset)
+
+
+# This code returns the .mgt header of a .mgt file scheduled by the previous tail run, with the position of the end of its schedule and the state of the HRU, without reading the .mgt file.
+def read_schedule(tail_run, mgt_file):
+    entry = tail_run["previous"]["hrus"][os.path.basename(mgt_file)]
+    return {"hruno": entry["hruno"], "subbasin": entry["subbasin"], "crop": entry["crop"], "position": entry["position"], "newline": entry["newline"], "state": entry["state"]}
+
+
+# This code records the state of a scheduled HRU at the end of the run: the ISM state of the HRU, and the position of the end of its schedule in the .mgt file,
+# which is the position of the schedule until its operation lines are written (see record_position).
+def record_hru(tail_run, mgt_file, header, unit_id, state):
+    tail_run["hrus"][os.path.basename(mgt_file)] = {
+        "hruno": header["hruno"],
+        "subbasin": header["subbasin"],
+        "crop": header["crop"],
+        "unit": unit_id,
+        "position": header["position"],
+        "newline": header["newline"],
+        "state": state,
+    }
+
+
+# This code records the file position of the end of the schedule of a .mgt file once its operation lines are written (see swat_files.write_schedule). The position is
+# returned by the write, so it is a byte offset whatever the line endings of the .mgt file.
+def record_position(tail_run, mgt_file, position):
+    tail_run["hrus"][os.path.basename(mgt_file)]["position"] = position
+
+
+# This code writes the state of the run to the tmp directory for the next tail run. The state is written atomically (written to a temporary file, then renamed).
+def finish_tail(tail_run, key):
+    if not tail_run["enabled"]:
+        return
+    hrus = dict(tail_run["previous"]["hrus"]) if tail_run["previous"] is not None else {}
+    hrus.update(tail_run["hrus"])
+    state = {
+        "ism": tail_run["ism"],
+        "settings": tail_run["settings"],
+        "key": key,
+        "end": tail_run["end"],
+        "output_hru": tail_run["output_hru"] if tail_run["output_hru"] is not None or tail_run["previous"] is None else tail_run["previous"]["output_hru"],
+        "state": tail_run["state"],
+        "hrus": hrus,
+    }
+    path = os.path.join(tail_run["tmp_directory"], STATE)
+    with open(path + ".tmp", "w") as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)
+    print(f"tail state written: {path}")
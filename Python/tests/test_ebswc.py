@@ -0,0 +1,69 @@
+"""
+Reference check of the EB-SWC irrigation event search
+
+isms.ebswc.find_events jumps directly from one irrigation event to the next instead of walking every day. This code checks it against a direct day loop with the
+semantics of the original EB-SWC script: day_count counts the eligible days (in season, after the calibration start year) since the last irrigation event, the first
+irrigation event only needs SWend <= AWD, and later events also need day_count >= interval. The check runs on random daily soil water arrays and eligible days, with
+day_count and irr_event_no carried over from a previous run (see tail.py), and checks that a run split in two with the state carried over finds the same events.
+
+Usage (from the Python folder):
+python -m pytest tests
+"""
+
+import numpy as np
+
+from isms.ebswc import find_events
+
+INTERVALS = [0, 1, 3, 7, 7.5, 14]
+
+
+# This code finds the irrigation events by walking every day, as the original EB-SWC script did.
+def reference_events(SWend, eligible, AWD, interval, day_count=0, irr_event_no=0):
+    events = []
+    for i in range(len(SWend)):
+        if not eligible[i]:
+            continue
+        day_count += 1
+        if irr_event_no == 0 and SWend[i] <= AWD:
+            events.append(i)
+            day_count = 0
+            irr_event_no += 1
+        elif irr_event_no >= 1 and day_count >= interval and SWend[i] <= AWD:
+            events.append(i)
+            day_count = 0
+            irr_event_no += 1
+    return events, day_count, irr_event_no
+
+
+# This code returns a random daily soil water array and eligible days: growing seasons of random length, with days dropped at random.
+def random_case(rng, days=730):
+    SWend = rng.uniform(20, 120, days)
+    eligible = np.zeros(days, dtype=bool)
+    for year_start in range(0, days, 365):
+        season_start = year_start + int(rng.integers(90, 150))
+        eligible[season_start:season_start + int(rng.integers(0, 180))] = True
+    eligible &= rng.random(days) > rng.uniform(0, 0.3)
+    SWend[~eligible] = np.nan #find_events only reads the eligible days
+    return SWend, eligible, rng.uniform(30, 110)
+
+
+def test_find_events_matches_day_loop():
+    rng = np.random.default_rng(2025)
+    for case in range(200):
+        SWend, eligible, AWD = random_case(rng)
+        for interval in INTERVALS:
+            for day_count, irr_event_no in [(0, 0), (0, 1), (int(rng.integers(0, 20)), int(rng.integers(1, 10))), (int(rng.integers(0, 20)), 0)]:
+                events, end_count, end_event_no = find_events(SWend, eligible, AWD, interval, day_count, irr_event_no)
+                assert (events, end_count, end_event_no) == reference_events(SWend, eligible, AWD, interval, day_count, irr_event_no), (case, interval, day_count, irr_event_no)
+
+
+def test_find_events_carried_over():
+    rng = np.random.default_rng(2026)
+    for case in range(200):
+        SWend, eligible, AWD = random_case(rng)
+        for interval in INTERVALS:
+            split = int(rng.integers(0, len(SWend) + 1))
+            whole = find_events(SWend, eligible, AWD, interval)
+            head, day_count, irr_event_no = find_events(SWend[:split], eligible[:split], AWD, interval)
+            tail, day_count, irr_event_no = find_events(SWend[split:], eligible[split:], AWD, interval, day_count, irr_event_no)
+            assert (head + [split + event for event in tail], day_count, irr_event_no) == whole, (case, interval, split)